@@ -0,0 +1,234 @@
+"""Benchmark the dependency tree generators on synthetic graphs.
+
+Synthetic inputs are generated in the formats consumed by the tree generators:
+`mvn dependency:tree -DoutputType=dot` (maven), `go mod graph` (golang),
+`npm list --json` (npm) and the flattened pypi JSON list (pypi). Every
+generator is measured on several graph shapes and sizes:
+
+    wide     few direct dependencies with a large fan-out of leaves
+    deep     long chains below every direct dependency
+    diamond  layered graph where every node depends on several nodes of the next layer
+    cyclic   diamond graph with additional back edges
+
+Wall time, peak memory (measured in a separate run with tracemalloc) and size
+of the JSON serialized output are reported per generator, shape and size.
+
+Usage:
+python3 benchmarks/bench_tree_generators.py
+python3 benchmarks/bench_tree_generators.py --sizes 1000 10000 --shapes diamond cyclic
+python3 benchmarks/bench_tree_generators.py --generators maven golang --json
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from f8a_utils.dependency_nodes import node_to_dict
+from f8a_utils.tree_generator import \
+    MavenDependencyTreeGenerator, \
+    NpmDependencyTreeGenerator, \
+    PypiDependencyTreeGenerator, \
+    GolangDependencyTreeGenerator, \
+    OUTPUT_FORMAT_COMPACT
+
+SHAPES = ('wide', 'deep', 'diamond', 'cyclic')
+SIZES = (1000, 10000, 100000)
+DIRECT_DEPENDENCIES = 20
+CHAIN_LENGTH = 200
+LAYER_WIDTH = 50
+FAN_OUT = 3
+
+
+def generate_graph(shape, edges, seed=0):
+    """Generate a synthetic dependency graph.
+
+    :param shape: str, one of SHAPES
+    :param edges: int, approximate number of edges
+    :param seed: int, seed of the random generator
+    :return: tuple of (list of direct dependency nodes, dict adjacency map of int nodes)
+    """
+    rnd = random.Random(seed)
+    graph = {}
+    if shape == 'wide':
+        directs = list(range(DIRECT_DEPENDENCIES))
+        node = len(directs)
+        for direct in directs:
+            graph[direct] = list(range(node, node + edges // len(directs)))
+            node += len(graph[direct])
+    elif shape == 'deep':
+        directs = list(range(max(edges // CHAIN_LENGTH, 1)))
+        node = len(directs)
+        for direct in directs:
+            previous = direct
+            for _ in range(CHAIN_LENGTH - 1):
+                graph[previous] = [node]
+                previous = node
+                node += 1
+    elif shape in ('diamond', 'cyclic'):
+        directs = list(range(DIRECT_DEPENDENCIES))
+        layers = [directs]
+        node = len(directs)
+        count = 0
+        while count < edges:
+            layer = list(range(node, node + LAYER_WIDTH))
+            node += LAYER_WIDTH
+            for parent in layers[-1]:
+                graph[parent] = rnd.sample(layer, FAN_OUT)
+                count += FAN_OUT
+            layers.append(layer)
+        if shape == 'cyclic':
+            # Point some of the deepest nodes back to the top of the graph.
+            for leaf in layers[-1][::5]:
+                graph[leaf] = [rnd.choice(layers[rnd.randrange(len(layers) - 1)])]
+    else:
+        raise ValueError('Unknown shape {}'.format(shape))
+    return directs, graph
+
+
+def _maven_coordinates(node):
+    return 'org.example:artifact-{n}:jar:1.{n}.0:compile'.format(n=node)
+
+
+def _golang_module(node):
+    return 'github.com/example/module-{n}@v1.{n}.0'.format(n=node)
+
+
+def to_maven_dot(directs, graph):
+    """Render the graph as `mvn dependency:tree -DoutputType=dot` output."""
+    root = 'org.example:root:jar:1.0.0'
+    lines = ['digraph "{}" {{ '.format(root)]
+    lines.extend('\t"{}" -> "{}" ; '.format(root, _maven_coordinates(d)) for d in directs)
+    for parent, children in graph.items():
+        lines.extend('\t"{}" -> "{}" ; '.format(
+            _maven_coordinates(parent), _maven_coordinates(c)) for c in children)
+    lines.append(' } ')
+    return '\n'.join(lines) + '\n'
+
+
+def to_go_mod_graph(directs, graph):
+    """Render the graph as `go mod graph` output."""
+    lines = ['github.com/example/app {}'.format(_golang_module(d)) for d in directs]
+    for parent, children in graph.items():
+        lines.extend('{} {}'.format(_golang_module(parent), _golang_module(c)) for c in children)
+    return '\n'.join(lines) + '\n'
+
+
+def to_npm_list(directs, graph):
+    """Render the graph as `npm list --json` output.
+
+    Like npm, every package is expanded only at its first occurrence.
+    """
+    expanded = set()
+
+    def entry(node):
+        value = {'version': '1.{}.0'.format(node)}
+        if node not in expanded and graph.get(node):
+            expanded.add(node)
+            value['dependencies'] = {}
+            stack.append((value['dependencies'], iter(graph[node])))
+        return value
+
+    dependencies = {}
+    stack = [(dependencies, iter(directs))]
+    while stack:
+        target, children = stack[-1]
+        for child in children:
+            target['package-{}'.format(child)] = entry(child)
+            break
+        else:
+            stack.pop()
+    return json.dumps({'dependencies': dependencies})
+
+
+def to_pypi_list(directs, graph):
+    """Render the graph as the flattened pypi JSON list, listing direct children only."""
+    return json.dumps([{
+        'package': 'package-{}'.format(direct),
+        'version': '1.{}.0'.format(direct),
+        'deps': [{'package': 'package-{}'.format(c), 'version': '1.{}.0'.format(c)}
+                 for c in graph.get(direct, [])]
+    } for direct in directs])
+
+
+GENERATORS = {
+    'maven': (MavenDependencyTreeGenerator, to_maven_dot),
+    'golang': (GolangDependencyTreeGenerator, to_go_mod_graph),
+    'npm': (NpmDependencyTreeGenerator, to_npm_list),
+    'pypi': (PypiDependencyTreeGenerator, to_pypi_list),
+}
+
+
+def run_benchmark(generator_name, content, repeat=1, measure_memory=True, node_records=False):
+    """Run one benchmark.
+
+    :return: dict with wall time (best of repeat), peak memory and output size
+    """
+    generator_class = GENERATORS[generator_name][0]
+    manifests = [{'filename': 'bench', 'filepath': '/bench', 'content': content}]
+
+    wall_time = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = generator_class(node_records).get_dependencies(
+            manifests, True, OUTPUT_FORMAT_COMPACT)
+        elapsed = time.perf_counter() - start
+        wall_time = elapsed if wall_time is None else min(wall_time, elapsed)
+
+    peak_memory = None
+    if measure_memory:
+        tracemalloc.start()
+        generator_class(node_records).get_dependencies(manifests, True, OUTPUT_FORMAT_COMPACT)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'wall_time': wall_time,
+        'peak_memory': peak_memory,
+        'output_size': len(json.dumps(result, default=node_to_dict)),
+    }
+
+
+def main():
+    """Entry to the tree generator benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--generators', nargs='+', choices=sorted(GENERATORS),
+                        default=sorted(GENERATORS))
+    parser.add_argument('--shapes', nargs='+', choices=SHAPES, default=SHAPES)
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES,
+                        help='approximate number of edges of the generated graphs')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='report the best wall time of this many runs')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the (slow) peak memory measurement')
+    parser.add_argument('--node-records', action='store_true',
+                        help='report transitive dependencies as compact node records')
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args()
+
+    if not args.json:
+        print('{:<8} {:<8} {:>8} {:>12} {:>14} {:>14}'.format(
+            'gen', 'shape', 'edges', 'time [s]', 'peak mem [kB]', 'output [kB]'))
+    for size in args.sizes:
+        for shape in args.shapes:
+            directs, graph = generate_graph(shape, size)
+            for name in args.generators:
+                content = GENERATORS[name][1](directs, graph)
+                stats = run_benchmark(name, content, args.repeat, not args.no_memory,
+                                      args.node_records)
+                stats.update(generator=name, shape=shape, edges=size)
+                if args.json:
+                    print(json.dumps(stats))
+                    continue
+                peak = '-' if stats['peak_memory'] is None else stats['peak_memory'] // 1024
+                print('{:<8} {:<8} {:>8} {:>12.4f} {:>14} {:>14}'.format(
+                    name, shape, size, stats['wall_time'], peak, stats['output_size'] // 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+"""Size bounded LRU caches, with optional TTL, and pluggable in-process and on-disk backends."""
+
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+_logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    """Abstract size bounded LRU cache with optional expiry, counting hits and misses."""
+
+    def __init__(self, max_size=1024, ttl=None):
+        """Init function for default value.
+
+        :param max_size: int, maximum number of entries kept in the cache
+        :param ttl: int, seconds entries are kept for unless set with a ttl of their own,
+                    default: until evicted
+        """
+        if max_size < 1:
+            raise ValueError('max_size must be positive')
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for the key, default if it is not cached."""
+        value = self._get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return default if value is None else value
+
+    def set(self, key, value, ttl=None):
+        """Cache the value under the key, evicting least recently used entries.
+
+        :param ttl: int, seconds the entry is kept for, default: ttl of the cache
+        """
+        if value is None:
+            raise ValueError('None values cannot be cached')
+        ttl = self.ttl if ttl is None else ttl
+        self._set(key, value, time.time() + ttl if ttl is not None else None)
+
+    def stats(self):
+        """Return dict with cache hits, misses and the current number of entries."""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self)}
+
+    @abstractmethod
+    def _get(self, key):
+        """Return the cached value for the key, None if it is not cached or expired."""
+
+    @abstractmethod
+    def _set(self, key, value, expires):
+        """Cache the value under the key until the expiry time (None: until evicted)."""
+
+    @abstractmethod
+    def clear(self):
+        """Drop all cached entries."""
+
+    @abstractmethod
+    def __len__(self):
+        """Return the number of cached entries."""
+
+
+class InMemoryCache(CacheBackend):
+    """Thread safe in-process LRU cache."""
+
+    def __init__(self, max_size=1024, ttl=None):
+        """Init function for default value.
+
+        :param max_size: int, maximum number of entries kept in the cache
+        :param ttl: int, seconds entries are kept for, default: until evicted
+        """
+        super().__init__(max_size, ttl)
+        self._data = OrderedDict()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key, value, expires):
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        """Return the number of cached entries."""
+        return len(self._data)
+
+
+class DiskCache(CacheBackend):
+    """On-disk LRU cache storing one serialized file per entry.
+
+    Recency is tracked by file modification times, so the cache can be shared
+    by several processes using the same directory.
+    """
+
+    _SUFFIX = '.cache'
+
+    def __init__(self, directory, max_size=1024, ttl=None, serializer=pickle):
+        """Init function for default value.
+
+        :param directory: str, directory to store the cache entries in
+        :param max_size: int, maximum number of entries kept in the cache
+        :param ttl: int, seconds entries are kept for, default: until evicted
+        :param serializer: module with dumps() and loads(), e.g. json when other users
+                           could write to the directory, unpickling runs arbitrary code
+        """
+        super().__init__(max_size, ttl)
+        self.directory = directory
+        self.serializer = serializer
+        os.makedirs(directory, exist_ok=True)
+        self._size = len(self._entries())
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + self._SUFFIX)
+
+    def _entries(self):
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.endswith(self._SUFFIX)]
+
+    def _get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fd:
+                expires, value = self.serializer.loads(fd.read())
+            if expires is not None and expires <= time.time():
+                os.unlink(path)
+                self._size = max(self._size - 1, 0)
+                return None
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError) as e:
+            _logger.error('Unable to read cache entry {p}: {e}'.format(p=path, e=e))
+            return None
+        return value
+
+    def _set(self, key, value, expires):
+        data = self.serializer.dumps((expires, value))
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        path = self._path(key)
+        exists = os.path.exists(path)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+        if not exists:
+            self._size += 1
+        if self._size > self.max_size:
+            self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries above the size limit."""
+        entries = []
+        for path in self._entries():
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                pass
+        entries.sort()
+        for _, path in entries[:max(len(entries) - self.max_size, 0)]:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self._size = min(len(entries), self.max_size)
+
+    def clear(self):
+        """Drop all cached entries."""
+        for path in self._entries():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self._size = 0
+
+    def __len__(self):
+        """Return the number of cached entries."""
+        return len(self._entries())
+
+
+class SqliteCache(CacheBackend):
+    """On-disk LRU cache storing serialized entries in a sqlite database.
+
+    The database can be shared by several processes, every process (and fork)
+    opens a connection of its own.
+    """
+
+    def __init__(self, path, max_size=1024, ttl=None, serializer=pickle):
+        """Init function for default value.
+
+        :param path: str, path to the database file
+        :param max_size: int, maximum number of entries kept in the cache
+        :param ttl: int, seconds entries are kept for, default: until evicted
+        :param serializer: module with dumps() and loads(), e.g. json when other users
+                           could write to the database, unpickling runs arbitrary code
+        """
+        super().__init__(max_size, ttl)
+        self.path = path
+        self.serializer = serializer
+        self._connection = None
+        self._pid = None
+        with self._lock:
+            self._connect().execute(
+                'CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, '
+                'expires REAL, accessed REAL)')
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires)')
+
+    def _connect(self):
+        """Return connection of this process, callers MUST hold self._lock."""
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                               check_same_thread=False)
+            self._pid = os.getpid()
+        return self._connection
+
+    @staticmethod
+    def _key(key):
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def _get(self, key):
+        key = self._key(key)
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute(
+                    'SELECT value, expires FROM entries WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                if row[1] is not None and row[1] <= now:
+                    connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    return None
+                connection.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+            return self.serializer.loads(row[0])
+        except (sqlite3.Error, ValueError, pickle.UnpicklingError) as e:
+            _logger.error('Unable to read cache entry {k}: {e}'.format(k=key, e=e))
+            return None
+
+    def _set(self, key, value, expires):
+        value = self.serializer.dumps(value)
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                'INSERT OR REPLACE INTO entries (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?)', (self._key(key), value, expires, time.time()))
+            # Expired entries go first, then the least recently used ones.
+            connection.execute('DELETE FROM entries WHERE expires <= ?', (time.time(),))
+            connection.execute(
+                'DELETE FROM entries WHERE key IN (SELECT key FROM entries '
+                'ORDER BY accessed DESC LIMIT -1 OFFSET ?)', (self.max_size,))
+
+    def clear(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._connect().execute('DELETE FROM entries')
+
+    def __len__(self):
+        """Return the number of cached entries."""
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
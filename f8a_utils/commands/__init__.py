@@ -1,7 +1,12 @@
 """Commands package."""
 
-from f8a_utils.commands.command import ExternalCommand
+from f8a_utils.commands.command import ExternalCommand, AsyncExternalCommand
+from f8a_utils.commands.runner import CommandRunner, CommandResult, run_commands
 
 
 # Silence linters...
 assert ExternalCommand is not None
+assert AsyncExternalCommand is not None
+assert CommandRunner is not None
+assert CommandResult is not None
+assert run_commands is not None
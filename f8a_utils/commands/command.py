@@ -1,12 +1,22 @@
 """A simple-to-use wrapper around subprocess.Popen(), for running external commands."""
+import asyncio
+import codecs
+import io
 import subprocess
+import threading
 import time
 import logging
 import os
 import signal
+from collections import deque
 
 logger = logging.getLogger(__name__)
 
+# Number of last stdout/stderr lines (or chunks) kept by ExternalCommand.iter_output()
+STREAM_TAIL_LINES = 100
+# Bytes read at once when the whole output of a command is collected
+_READ_CHUNK_SIZE = 1 << 16
+
 
 class ExternalCommand(object):
     """Wrapper around subprocess.Popen(), for running external commands easily."""
@@ -23,15 +33,22 @@ class ExternalCommand(object):
         self._env = {}
 
         self.duration = None
+        # Resource usage of the command and its waited-for children, None if unknown.
+        self.cpu_user = None
+        self.cpu_system = None
+        self.max_rss = None
+        self.read_blocks = None
+        self.write_blocks = None
 
         self.stdin = None
         self.stdout = None
         self.stderr = None
         self.rc = None
         self.expired = False
+        self.result = None
 
     def run(self, timeout=None, env=None, update_env=None,
-            stdin=None, cwd=None, raise_on_error=False):
+            stdin=None, cwd=None, raise_on_error=False, consumer=None):
         """Run the command.
 
         :param timeout: int, timeout (in seconds), default: no timeout.
@@ -40,10 +57,23 @@ class ExternalCommand(object):
         :param stdin: str, standard input for the command.
         :param cwd: str, working directory for the command.
         :param raise_on_error: bool, raise subprocess.CalledProcessError() on failure
+        :param consumer: callable, called with an iterator over stdout lines while the
+                         command runs, its return value is stored in self.result
+                         (None on failure) and stdout is not kept in self.stdout.
 
         :return: True on success, False otherwise. When raise_on_error is True,
                  then an exception is raised on failure.
         """
+        if consumer is not None:
+            return self._exec_consumer(
+                consumer,
+                timeout=timeout,
+                env=env,
+                update_env=update_env,
+                stdin=stdin,
+                cwd=cwd,
+                raise_on_error=raise_on_error
+            )
         return self._exec(
             timeout=timeout,
             env=env,
@@ -53,6 +83,46 @@ class ExternalCommand(object):
             raise_on_error=raise_on_error
         )
 
+    def iter_output(self, timeout=None, env=None, update_env=None, stdin=None, cwd=None,
+                    raise_on_error=False, chunk_size=None, stdout_tail=STREAM_TAIL_LINES,
+                    stderr_tail=STREAM_TAIL_LINES, stdout_callback=None, stderr_callback=None):
+        """Run the command, yielding its stdout while it runs.
+
+        The command is started on first iteration. Once the output is exhausted,
+        self.rc, self.duration, self.stdout and self.stderr are set as by run().
+        Closing the iterator early kills the command.
+
+        :param chunk_size: int, yield output as it arrives, reading at most this many bytes
+                           at once, default: lines.
+        :param stdout_tail: int, number of last stdout lines (chunks) kept in self.stdout,
+                            None keeps all, 0 none (self.stdout is None then).
+        :param stderr_tail: int, number of last stderr lines kept in self.stderr,
+                            None keeps all.
+        :param stdout_callback: callable, called with every stdout line (chunk).
+        :param stderr_callback: callable, called with every stderr line, from another thread.
+
+        :return: iterator over stdout lines (chunks). When raise_on_error is True,
+                 then subprocess.CalledProcessError() is raised at its end on failure.
+                 See run() for the other params.
+        """
+        return self._exec_stream(timeout, env, update_env, stdin, cwd, raise_on_error,
+                                 chunk_size, stdout_tail, stderr_tail,
+                                 stdout_callback, stderr_callback)
+
+    def _reset(self):
+        """Forget the outcome of a previous run of the command."""
+        self.duration = None
+        self.cpu_user = None
+        self.cpu_system = None
+        self.max_rss = None
+        self.read_blocks = None
+        self.write_blocks = None
+        self.stdout = None
+        self.stderr = None
+        self.rc = None
+        self.expired = False
+        self.result = None
+
     def _prep(self):
         """Prepare before running the command."""
         pass
@@ -64,16 +134,17 @@ class ExternalCommand(object):
         """
         pass
 
-    def _exec(self, timeout=None, env=None, update_env=None,
-              stdin=None, cwd=None, raise_on_error=False):
-
-        self._prep()
-
+    def _get_env(self, env=None, update_env=None):
         if update_env:
             env = env if env is not None else os.environ.copy()
             env.update(self._env)
             env.update(update_env)
+        return env
 
+    def _start(self, env=None, update_env=None, stdin=None, cwd=None):
+        self._prep()
+
+        env = self._get_env(env, update_env)
         proc = subprocess.Popen(
             self._cmd,
             env=env,
@@ -86,51 +157,311 @@ class ExternalCommand(object):
             preexec_fn=os.setsid
         )
 
+        logger.debug('Running command "{cmd}"'.format(cmd=''.join(self._cmd)))
+        return proc
+
+    def _exec(self, timeout=None, env=None, update_env=None,
+              stdin=None, cwd=None, raise_on_error=False):
+        # Output is collected by the streaming core, which reaps the process with os.wait4().
+        output = self._exec_stream(timeout, env, update_env, stdin, cwd, raise_on_error,
+                                   _READ_CHUNK_SIZE, None, None, None, None, report=False)
+        for _ in output:
+            pass
+
+        return self._report(timeout, raise_on_error)
+
+    def _exec_stream(self, timeout, env, update_env, stdin, cwd, raise_on_error,
+                     chunk_size, stdout_tail, stderr_tail, stdout_callback, stderr_callback,
+                     report=True):
+        self._reset()
+        proc = self._start(env, update_env, stdin, cwd)
         start_time = time.time()
 
-        logger.debug('Running command "{cmd}"'.format(cmd=''.join(self._cmd)))
+        stdout = deque(maxlen=stdout_tail)
+        stderr = deque(maxlen=stderr_tail)
+        # Stderr is read by a thread, so that the process never blocks on a full pipe.
+        reader = threading.Thread(target=self._read_stderr,
+                                  args=(proc, stderr, stderr_callback), daemon=True)
+        reader.start()
+        # Held while the timer signals the process and while the process is reaped.
+        guard = threading.Lock()
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, self._expire, (proc, guard))
+            timer.start()
+
+        if chunk_size:
+            read = self._chunk_reader(proc.stdout, chunk_size)
+        else:
+            read = proc.stdout.readline
+
+        finished = False
+        try:
+            for data in iter(read, ''):
+                stdout.append(data)
+                if stdout_callback is not None:
+                    stdout_callback(data)
+                yield data
+            finished = True
+        finally:
+            if not finished:
+                self._kill(proc)
+            rusage = self._wait(proc, guard)
+            if timer is not None:
+                timer.cancel()
+            reader.join()
+            proc.stdout.close()
+            proc.stderr.close()
+            self.duration = (time.time() - start_time)
+            self._account(rusage)
+            self.stdout = ''.join(stdout) if stdout_tail != 0 else None
+            self.stderr = ''.join(stderr)
+            self.rc = 1 if self.expired else proc.returncode
+            self._cleanup()
+
+        if report:
+            self._report(timeout, raise_on_error)
+
+    def _exec_consumer(self, consumer, timeout=None, env=None, update_env=None,
+                       stdin=None, cwd=None, raise_on_error=False):
+        # The consumer may fail before the output is started, see below.
+        self._reset()
+        output = self._exec_stream(timeout, env, update_env, stdin, cwd, raise_on_error,
+                                   None, 0, None, None, None, report=False)
+        error = None
         try:
-            self.stdout, self.stderr = proc.communicate(timeout=timeout)
-            self.rc = proc.returncode
+            result = consumer(output)
+        except Exception as e:
+            if self.rc is None and not self.expired:
+                # The command is still running, its output is what the consumer failed on.
+                output.close()
+                raise
+            # The output ended, the outcome of the command decides what is reported.
+            error, result = e, None
+        # Drain output the consumer did not read, so that the command can exit.
+        for _ in output:
+            pass
+
+        if not self.rc and error is not None:
+            raise error
+        if not self.rc:
+            self.result = result
+        return self._report(timeout, raise_on_error)
+
+    @staticmethod
+    def _chunk_reader(stream, chunk_size):
+        """Return a function reading what is available of the text stream, '' at EOF.
+
+        TextIOWrapper.read(n) waits for n characters, the pipe is read directly instead
+        and decoded the way the stream would.
+        """
+        fd = stream.fileno()
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder(stream.encoding)(stream.errors), translate=True)
+
+        def read():
+            while True:
+                data = os.read(fd, chunk_size)
+                text = decoder.decode(data, final=not data)
+                # A chunk may end in the middle of a character or of '\r\n'.
+                if text or not data:
+                    return text
+        return read
 
-        except subprocess.TimeoutExpired:
-            # kill the whole process group - the process and its children
-            os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+    @staticmethod
+    def _read_stderr(proc, stderr, callback):
+        for line in iter(proc.stderr.readline, ''):
+            stderr.append(line)
+            if callback is not None:
+                callback(line)
 
-            self.stdout, self.stderr = proc.communicate()
-            self.rc = 1
+    def _expire(self, proc, guard):
+        """Kill the command when the timeout expires, unless it was reaped meanwhile."""
+        with guard:
+            if proc.returncode is not None:
+                # The pid may belong to another process already.
+                return
             self.expired = True
+            self._kill(proc)
+
+    @staticmethod
+    def _kill(proc):
+        """Kill the whole process group - the process and its children.
+
+        The command leads a session of its own, so the group id is its pid. The group
+        is signalled even when the process exited, as its children may hold its pipes.
+        """
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    @classmethod
+    def _wait(cls, proc, guard):
+        """Wait for the process to exit, then reap it under the guard held by _expire().
 
+        Has to be called once the pipes are drained. The process is left unreaped while
+        it runs, so that a timer firing meanwhile never signals a pid reused by another
+        process.
+
+        :return: resource usage of the process and its waited-for children, None if unknown
+        """
+        if hasattr(os, 'waitid'):
+            try:
+                os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+            except ChildProcessError:
+                pass
+            with guard:
+                return cls._reap(proc)
+
+        # Without os.waitid() (macOS), poll so that the guard is not held while waiting.
+        while True:
+            with guard:
+                rusage = cls._reap(proc, os.WNOHANG)
+                if proc.returncode is not None:
+                    return rusage
+            time.sleep(0.05)
+
+    @staticmethod
+    def _reap(proc, options=0):
+        """Reap the process with os.wait4() to get its resource usage.
+
+        The exit status is stored in proc.returncode, so that Popen does not wait for
+        the process again; it stays None when options has os.WNOHANG and the process runs.
+
+        :return: resource usage of the process and its waited-for children, None if unknown
+        """
+        # os.wait4() is available on Unix only.
+        if not hasattr(os, 'wait4') or proc.returncode is not None:
+            proc.wait()
+            return None
+        try:
+            pid, status, rusage = os.wait4(proc.pid, options)
+        except ChildProcessError:
+            # SIGCLD is ignored or waiting for children was disabled otherwise,
+            # the child is dead and neither its status nor its usage are available.
+            proc.wait()
+            return None
+        if not pid:
+            return None
+        if os.WIFSIGNALED(status):
+            proc.returncode = -os.WTERMSIG(status)
+        else:
+            proc.returncode = os.WEXITSTATUS(status)
+        return rusage
+
+    def _account(self, rusage):
+        """Copy resource usage of the finished process."""
+        if rusage is None:
+            return
+        self.cpu_user = rusage.ru_utime
+        self.cpu_system = rusage.ru_stime
+        # kilobytes on Linux, bytes on macOS
+        self.max_rss = rusage.ru_maxrss
+        self.read_blocks = rusage.ru_inblock
+        self.write_blocks = rusage.ru_oublock
+
+    def _resources(self):
+        """Format resource usage for log messages."""
+        if self.cpu_user is None:
+            return ''
+        return ' (user {u:.2f}s, sys {s:.2f}s, max rss {m}, blocks in {i}, out {o})'.format(
+            u=self.cpu_user, s=self.cpu_system, m=self.max_rss,
+            i=self.read_blocks, o=self.write_blocks)
+
+    def _report(self, timeout, raise_on_error):
+        """Log the outcome of the command, raise on failure if asked to.
+
+        :return: True on success, False otherwise
+        """
+        if self.expired:
+            logger.error(
+                'Command "{cmd}" timed out after {t} seconds{r}: {stderr}'.format(
+                    cmd=' '.join(self._cmd), t=timeout, r=self._resources(), stderr=self.stderr
+                )
+            )
+        elif not self.rc:
+            # success
+            logger.debug(
+                'Command {cmd} succeeded in {t} seconds{r}'.format(
+                    cmd=self._cmd, t=self.duration, r=self._resources())
+            )
+            return True
+        else:
             logger.error(
-                'Command "{cmd}" timed out after {t} seconds: {stderr}'.format(
-                    cmd=' '.join(self._cmd), t=timeout, stderr=self.stderr
+                'Command "{cmd}" returned {rc}{r}: {stderr}'.format(
+                    cmd=' '.join(self._cmd), rc=self.rc, r=self._resources(), stderr=self.stderr
                 )
             )
 
+        if raise_on_error:
+            raise subprocess.CalledProcessError(self.rc, self._cmd, self.stderr)
+        return False
+
+    def __str__(self):
+        return 'ExternalCommand: ' + ' '.join(self._cmd)
+
+
+class AsyncExternalCommand(ExternalCommand):
+    """Asyncio counterpart of ExternalCommand, supervising the command from the event loop.
+
+    Resource usage is not recorded, as the process is reaped by the loop's child watcher.
+    """
+
+    async def run(self, timeout=None, env=None, update_env=None,
+                  stdin=None, cwd=None, raise_on_error=False):
+        """Run the command.
+
+        Cancelling the run kills the command, see ExternalCommand.run() for the params.
+
+        :return: True on success, False otherwise. When raise_on_error is True,
+                 then an exception is raised on failure.
+        """
+        self._reset()
+        self._prep()
+
+        proc = await asyncio.create_subprocess_exec(
+            *self._cmd,
+            env=self._get_env(env, update_env),
+            stdin=stdin,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            start_new_session=True
+        )
+
+        start_time = time.time()
+
+        logger.debug('Running command "{cmd}"'.format(cmd=''.join(self._cmd)))
+        # Read both pipes meanwhile, so that output written before a timeout is kept.
+        stdout = asyncio.ensure_future(proc.stdout.read())
+        stderr = asyncio.ensure_future(proc.stderr.read())
+        waiter = asyncio.ensure_future(proc.wait())
+        tasks = [stdout, stderr, waiter]
+        try:
+            # The timeout covers the pipes too, children of the command may keep them open.
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            if pending:
+                self._kill(proc)
+                self.expired = True
+                await asyncio.wait(tasks)
+            self.rc = 1 if self.expired else proc.returncode
+
+            self.stdout = stdout.result().decode('utf-8', 'replace')
+            self.stderr = stderr.result().decode('utf-8', 'replace')
+
+        except asyncio.CancelledError:
+            self._kill(proc)
+            for task in tasks:
+                task.cancel()
+            await proc.wait()
+            raise
+
         finally:
             self.duration = (time.time() - start_time)
             self._cleanup()
 
-            if not self.rc:
-                # success
-                logger.debug(
-                    'Command {cmd} succeeded in {t} seconds'.format(cmd=self._cmd, t=self.duration)
-                )
-            else:
-                # failure
-                # only log non-zero return code error here as timeout errors are logged elsewhere
-                if not self.expired:
-                    logger.error(
-                        'Command "{cmd}" returned {rc}: {stderr}'.format(
-                            cmd=' '.join(self._cmd), rc=self.rc, stderr=self.stderr
-                        )
-                    )
-
-                if raise_on_error:
-                    raise subprocess.CalledProcessError(self.rc, self._cmd, self.stderr)
-                return False
-
-        return True
+        return self._report(timeout, raise_on_error)
 
     def __str__(self):
-        return 'ExternalCommand: ' + ' '.join(self._cmd)
+        return 'AsyncExternalCommand: ' + ' '.join(self._cmd)
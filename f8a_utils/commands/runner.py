@@ -0,0 +1,109 @@
+"""Run many ExternalCommand instances concurrently."""
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Default number of commands run at once by a CommandRunner
+DEFAULT_MAX_COMMANDS = 4
+
+CommandResult = namedtuple('CommandResult', ['command', 'rc', 'duration', 'expired', 'error'])
+CommandResult.__doc__ = """Outcome of one command.
+
+rc, duration and expired are copied from the command, rc is None if the command was
+not started before the deadline or could not be started, error is the exception
+raised by ExternalCommand.run() in the latter case.
+"""
+
+
+class CommandRunner(object):
+    """Run ExternalCommand instances concurrently, with a limit shared by all batches.
+
+    A runner shared by all callers (e.g. tasks of a worker) bounds the number of
+    commands running in the whole process.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_COMMANDS):
+        """Init function for default value.
+
+        :param max_workers: int, maximum number of commands running at once
+        """
+        if max_workers < 1:
+            raise ValueError('max_workers must be positive')
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def run(self, commands, timeout=None, deadline=None, **run_kwargs):
+        """Run the commands concurrently, wait for all of them to finish.
+
+        :param commands: iterable of ExternalCommand, or of (ExternalCommand, dict) tuples
+                         where the dict holds ExternalCommand.run() arguments of the
+                         command, e.g. its own timeout or cwd
+        :param timeout: int, default timeout (in seconds) of every command
+        :param deadline: int, seconds for the whole batch; running commands are killed
+                         when it passes and commands not started by then are skipped
+        :param run_kwargs: other ExternalCommand.run() arguments shared by all commands
+        :return: list of CommandResult in order of the commands
+        """
+        end_time = time.time() + deadline if deadline is not None else None
+        executor = self._get_executor()
+        futures = []
+        for command in commands:
+            kwargs = dict(run_kwargs, timeout=timeout)
+            if isinstance(command, tuple):
+                command, command_kwargs = command
+                kwargs.update(command_kwargs)
+            futures.append(executor.submit(self._run_command, command, kwargs, end_time))
+        return [future.result() for future in futures]
+
+    @staticmethod
+    def _run_command(command, kwargs, end_time):
+        """Run one command, within the time left until the deadline."""
+        if end_time is not None:
+            remaining = end_time - time.time()
+            if remaining <= 0:
+                logger.error('Command "{cmd}" skipped, deadline passed'.format(cmd=command))
+                return CommandResult(command, None, None, True, None)
+            if kwargs.get('timeout') is None or kwargs['timeout'] > remaining:
+                kwargs['timeout'] = remaining
+        try:
+            command.run(**kwargs)
+        except Exception as e:
+            logger.error('Command "{cmd}" failed: {e}'.format(cmd=command, e=e))
+            return CommandResult(command, command.rc, command.duration, command.expired, e)
+        return CommandResult(command, command.rc, command.duration, command.expired, None)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def close(self):
+        """Wait for running commands and release the worker threads."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __enter__(self):
+        """Return the runner, closed on exit."""
+        return self
+
+    def __exit__(self, *_args):
+        """Close the runner."""
+        self.close()
+
+
+def run_commands(commands, max_workers=DEFAULT_MAX_COMMANDS, timeout=None, deadline=None,
+                 **run_kwargs):
+    """Run the commands concurrently with a runner of their own.
+
+    :return: list of CommandResult, see CommandRunner.run() for the params
+    """
+    with CommandRunner(max_workers) as runner:
+        return runner.run(commands, timeout=timeout, deadline=deadline, **run_kwargs)
@@ -5,3 +5,35 @@ SNYK_API_TOKEN_VALIDATION_URL = os.getenv('SNYK_API_TOKEN_VALIDATION_URL',
                                           'https://snyk.io/api/v1/verify/token')
 ENCRYPTION_KEY_FOR_SNYK_TOKEN = os.getenv('ENCRYPTION_KEY_FOR_SNYK_TOKEN',
                                           'zXsuzlFTHnEDGRxsNMusmIMvXZ2Eg0DSJrXq8ounHP8')
+# Upper bound of manifests parsed at once by DependencyFinder.scan_and_find_dependencies_async
+MAX_CONCURRENT_MANIFEST_PARSES = int(os.getenv('MAX_CONCURRENT_MANIFEST_PARSES',
+                                               os.cpu_count() or 1))
+
+# Shared HTTP session, see f8a_utils.http_client
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 10))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 10))
+# Pool sizes of hosts with many concurrent requests, "host=size,host=size"
+HTTP_HOST_POOL_MAXSIZE = os.getenv(
+    'HTTP_HOST_POOL_MAXSIZE',
+    'registry.npmjs.org=20,pypi.org=20,repo.maven.apache.org=20,pkg.go.dev=20,api.github.com=20')
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 0))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 10))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 60))
+
+# Number of packages looked up at once by f8a_utils.versions.get_versions_for_ep_bulk
+VERSION_LOOKUP_MAX_WORKERS = int(os.getenv('VERSION_LOOKUP_MAX_WORKERS', 16))
+
+# Cache of registry version lookups, see f8a_utils.versions.get_version_cache
+# Backend: "memory", "sqlite" (at VERSION_CACHE_PATH) or "none"
+VERSION_CACHE_BACKEND = os.getenv('VERSION_CACHE_BACKEND', 'memory')
+# The directory of the database is created accessible to the current user only.
+VERSION_CACHE_PATH = os.getenv('VERSION_CACHE_PATH', os.path.join(
+    os.path.expanduser('~'), '.cache', 'f8a_utils', 'versions_cache.sqlite'))
+VERSION_CACHE_SIZE = int(os.getenv('VERSION_CACHE_SIZE', 10000))
+# Seconds version lists are cached for, per ecosystem
+VERSION_CACHE_TTL = {
+    'npm': int(os.getenv('VERSION_CACHE_TTL_NPM', 3600)),
+    'pypi': int(os.getenv('VERSION_CACHE_TTL_PYPI', 3600)),
+    'maven': int(os.getenv('VERSION_CACHE_TTL_MAVEN', 3600)),
+    'golang': int(os.getenv('VERSION_CACHE_TTL_GOLANG', 3600)),
+}
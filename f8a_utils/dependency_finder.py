@@ -1,10 +1,21 @@
 """Definition of a class to find dependencies from an input manifest file."""
 
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import pickle
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from f8a_utils.commands import ExternalCommand
+from f8a_utils.default_config import MAX_CONCURRENT_MANIFEST_PARSES
 from f8a_utils.tree_generator import \
     MavenDependencyTreeGenerator as MvnTree, \
     NpmDependencyTreeGenerator as NpmTree, \
     PypiDependencyTreeGenerator as PyTree, \
-    GolangDependencyTreeGenerator as GoTree
+    GolangDependencyTreeGenerator as GoTree, \
+    OUTPUT_FORMAT_LEGACY
 
 
 def get_dependency_tree_generator(eco):
@@ -23,19 +34,369 @@ def get_dependency_tree_generator(eco):
     return func_dict.get(eco)
 
 
+def _get_manifest_details(ecosystem, manifest, show_transitive, node_records=False,
+                          generator_options=None):
+    """Resolve a single manifest, module level so that it can be run in a worker process."""
+    dependency_tree_generator = get_dependency_tree_generator(ecosystem)(
+        node_records, **(generator_options or {}))
+    return dependency_tree_generator.get_manifest_details(manifest, show_transitive)
+
+
+def _get_cache_key(ecosystem, manifest, show_transitive, node_records=False,
+                   generator_options=None):
+    """Return cache key of the manifest, None if its content cannot be hashed without consuming it.
+
+    :param ecosystem: str, ecosystem name
+    :param manifest: dict with manifest content
+    :param show_transitive: bool, resolve transitive dependencies
+    :param node_records: bool, transitive dependencies are reported as node records
+    :param generator_options: dict, ecosystem specific options of the tree generator
+    :return: tuple (ecosystem, show_transitive, node_records, options, sha256 of content) or None
+    """
+    content = manifest['content']
+    digest = hashlib.sha256()
+    if isinstance(content, str):
+        digest.update(content.encode('utf-8'))
+    elif isinstance(content, bytes):
+        digest.update(content)
+    elif isinstance(content, os.PathLike):
+        with open(content, 'rb') as fd:
+            for chunk in iter(lambda: fd.read(1 << 20), b''):
+                digest.update(chunk)
+    else:
+        return None
+    # Executors do not change the result, sets are keyed by their sorted items.
+    options = json.dumps({key: value for key, value in (generator_options or {}).items()
+                          if key != 'executor'}, sort_keys=True, default=sorted)
+    return ecosystem, show_transitive, node_records, options, digest.hexdigest()
+
+
+def _node_key(node):
+    """Return (package, version) of a dependency given as dict or node record."""
+    if isinstance(node, dict):
+        return node['package'], node['version']
+    return node.package, node.version
+
+
+def _get_nodes(details):
+    """Return tuple (set of direct, set of transitive (package, version)) of manifest details."""
+    direct, transitive = set(), set()
+    for dependency in (details or {}).get('_resolved', []):
+        direct.add(_node_key(dependency))
+        transitive.update(_node_key(node) for node in dependency.get('deps', []))
+    return direct, transitive
+
+
+def _diff_nodes(base, head):
+    """Diff two sets of (package, version) nodes.
+
+    :return: dict with added and removed nodes and packages with changed versions
+    """
+    def sort_key(node):
+        return node[0], str(node[1])
+
+    base_versions, head_versions = {}, {}
+    for nodes, versions in ((base, base_versions), (head, head_versions)):
+        for package, version in nodes:
+            versions.setdefault(package, set()).add(version)
+    return {
+        "added": [{"package": package, "version": version}
+                  for package, version in sorted(head - base, key=sort_key)
+                  if package not in base_versions],
+        "removed": [{"package": package, "version": version}
+                    for package, version in sorted(base - head, key=sort_key)
+                    if package not in head_versions],
+        "changed": [{"package": package,
+                     "base_versions": sorted(base_versions[package], key=str),
+                     "head_versions": sorted(head_versions[package], key=str)}
+                    for package in sorted(base_versions.keys() & head_versions.keys())
+                    if base_versions[package] != head_versions[package]],
+    }
+
+
+# Parse slots shared by all async scans running in the same event loop.
+_parse_semaphores = weakref.WeakKeyDictionary()
+
+
+def _get_parse_semaphore(loop):
+    """Return semaphore bounding concurrent manifest parses in the event loop.
+
+    Has to be called from a coroutine running in the loop, so that the semaphore binds to it.
+    """
+    semaphore = _parse_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _parse_semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENT_MANIFEST_PARSES)
+    return semaphore
+
+
 class DependencyFinder():
     """Implementation of methods to find dependencies from manifest file."""
 
     @staticmethod
-    def scan_and_find_dependencies(ecosystem, manifests, show_transitive):
-        """Scan the dependencies files to fetch transitive deps."""
+    def scan_and_find_dependencies(ecosystem, manifests, show_transitive,
+                                   max_workers=None, executor=None,
+                                   output_format=OUTPUT_FORMAT_LEGACY, cache=None,
+                                   node_records=False, generator_options=None):
+        """Scan the dependencies files to fetch transitive deps.
+
+        Manifests are resolved sequentially unless max_workers or executor is given,
+        in which case they are resolved concurrently and results are kept in input order.
+        Manifest content has to be picklable (str, bytes or a path) for process pools.
+        With a cache, manifests are looked up by ecosystem, show_transitive and hash
+        of their content first; streamed content (file objects, iterators) is not cached.
+
+        :param ecosystem: str, ecosystem name
+        :param manifests: list of dicts with filename, filepath and content
+        :param show_transitive: bool or "true"/"false", resolve transitive dependencies
+        :param max_workers: int, number of worker processes to resolve manifests with
+        :param executor: concurrent.futures.Executor, resolve manifests with this executor
+        :param output_format: str, "legacy", "compact" (every manifest listed once)
+                              or "graph" (unique nodes plus direct/edge lists per manifest)
+        :param cache: f8a_utils.cache.CacheBackend, cache of resolved manifests
+        :param node_records: bool, report transitive dependencies as compact node records,
+                             see f8a_utils.dependency_nodes.node_to_dict()
+        :param generator_options: dict, ecosystem specific options of the tree generator,
+                                  e.g. {"per_module": True, "scopes": ["compile"]} for maven
+        :return: dict, dependency tree
+        """
+        if type(show_transitive) is not bool:
+            show_transitive = show_transitive == "true"
+        dependency_tree_generator = get_dependency_tree_generator(ecosystem)(
+            node_records, **(generator_options or {}))
+        if executor is None and max_workers is None and cache is None:
+            return dependency_tree_generator.get_dependencies(
+                manifests, show_transitive, output_format)
+
+        details = DependencyFinder._get_details(
+            dependency_tree_generator, ecosystem, manifests, show_transitive, max_workers,
+            executor, cache, node_records, generator_options)
+        return dependency_tree_generator.format_result(details, output_format)
+
+    @staticmethod
+    def _get_details(dependency_tree_generator, ecosystem, manifests, show_transitive,
+                     max_workers, executor, cache, node_records, generator_options):
+        """Resolve manifest details, from the cache or with the executor, keeping input order."""
+        details, keys, pending = DependencyFinder._get_cached(
+            ecosystem, manifests, show_transitive, cache, node_records, generator_options)
+        pending_manifests = [manifests[index] for index in pending]
+        count = len(pending_manifests)
+        args = ([ecosystem] * count, pending_manifests, [show_transitive] * count,
+                [node_records] * count, [generator_options] * count)
+        if executor is not None:
+            resolved = executor.map(_get_manifest_details, *args)
+        elif max_workers is not None and count:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                resolved = list(pool.map(_get_manifest_details, *args))
+        else:
+            resolved = (dependency_tree_generator.get_manifest_details(manifest, show_transitive)
+                        for manifest in pending_manifests)
+
+        for index, dep in zip(pending, resolved):
+            details[index] = dep
+            DependencyFinder._set_cached(cache, keys[index], dep)
+        return details
+
+    @staticmethod
+    def diff_dependencies(ecosystem, base_manifests, head_manifests, show_transitive=True,
+                          max_workers=None, executor=None, cache=None, node_records=False,
+                          generator_options=None):
+        """Diff dependencies of two revisions of manifests, e.g. base and head of a pull request.
+
+        Manifests are paired by filepath and filename. Pairs with the same content are not
+        resolved at all, the others are resolved as by scan_and_find_dependencies(), so with
+        a cache the base revision analysed before is not parsed again.
+        Packages present in both revisions with different versions are reported as changed,
+        other packages as added or removed.
+
+        :param ecosystem: str, ecosystem name
+        :param base_manifests: list of dicts with filename, filepath and content
+        :param head_manifests: list of dicts with filename, filepath and content
+        :param show_transitive: bool or "true"/"false", diff transitive dependencies too
+        :return: dict, {"result": [{"manifest_file_path", "manifest_file", "ecosystem",
+                 "direct": diff, "transitive": diff}]} listing manifests of both revisions,
+                 where diff is {"added": [{"package", "version"}], "removed": [...],
+                 "changed": [{"package", "base_versions", "head_versions"}]}
+        """
+        if type(show_transitive) is not bool:
+            show_transitive = show_transitive == "true"
+        dependency_tree_generator = get_dependency_tree_generator(ecosystem)(
+            node_records, **(generator_options or {}))
+
+        def manifest_id(manifest):
+            return manifest['filepath'], manifest['filename']
+
+        base = {manifest_id(manifest): manifest for manifest in base_manifests}
+        head = {manifest_id(manifest): manifest for manifest in head_manifests}
+        pairs = [(base.get(mid), head.get(mid)) for mid in
+                 list(base) + [mid for mid in head if mid not in base]]
+        changed = [manifest for pair in pairs if not DependencyFinder._same_content(*pair)
+                   for manifest in pair if manifest is not None]
+        details = iter(DependencyFinder._get_details(
+            dependency_tree_generator, ecosystem, changed, show_transitive, max_workers,
+            executor, cache, node_records, generator_options))
+
+        result = []
+        for base_manifest, head_manifest in pairs:
+            manifest = head_manifest or base_manifest
+            diff = {
+                "ecosystem": ecosystem,
+                "manifest_file_path": manifest['filepath'],
+                "manifest_file": manifest['filename'],
+            }
+            if DependencyFinder._same_content(base_manifest, head_manifest):
+                diff.update(direct=_diff_nodes(set(), set()), transitive=_diff_nodes(set(), set()))
+            else:
+                base_nodes = _get_nodes(next(details) if base_manifest else None)
+                head_nodes = _get_nodes(next(details) if head_manifest else None)
+                diff.update(direct=_diff_nodes(base_nodes[0], head_nodes[0]),
+                            transitive=_diff_nodes(base_nodes[1], head_nodes[1]))
+            result.append(diff)
+        return {"result": result}
+
+    @staticmethod
+    def _same_content(base_manifest, head_manifest):
+        """Return True if both manifests exist and have the same content (or path)."""
+        if base_manifest is None or head_manifest is None:
+            return False
+        content = base_manifest['content']
+        return isinstance(content, (str, bytes, os.PathLike)) and \
+            type(content) is type(head_manifest['content']) and \
+            content == head_manifest['content']
+
+    @staticmethod
+    def scan_and_find_dependencies_from_command(ecosystem, cmd, show_transitive,
+                                                filename, filepath, timeout=None, cwd=None,
+                                                update_env=None,
+                                                output_format=OUTPUT_FORMAT_LEGACY,
+                                                node_records=False, generator_options=None):
+        """Run the build tool and parse its output while it is produced.
+
+        E.g. `go mod graph` or `mvn dependency:tree -DoutputType=dot -DoutputFile=/dev/stdout`
+        output is parsed line by line, so it is never held in memory as a whole; npm and
+        pypi JSON documents are buffered by their tree generators.
+
+        :param ecosystem: str, ecosystem name
+        :param cmd: list, build tool command printing the dependency graph on stdout
+        :param show_transitive: bool or "true"/"false", resolve transitive dependencies
+        :param filename: str, manifest file name reported in the result
+        :param filepath: str, manifest file path reported in the result
+        :param timeout: int, timeout (in seconds) of the command, default: no timeout
+        :param cwd: str, working directory for the command
+        :param update_env: dict, additional environment variables for the command
+        :return: dict, dependency tree, see scan_and_find_dependencies() for other params
+        :raises subprocess.CalledProcessError: when the command fails or times out
+        """
+        if type(show_transitive) is not bool:
+            show_transitive = show_transitive == "true"
+        dependency_tree_generator = get_dependency_tree_generator(ecosystem)(
+            node_records, **(generator_options or {}))
+
+        def consumer(lines):
+            manifest = {"filename": filename, "filepath": filepath, "content": lines}
+            return dependency_tree_generator.get_manifest_details(manifest, show_transitive)
+
+        command = ExternalCommand(cmd)
+        command.run(timeout=timeout, cwd=cwd, update_env=update_env, raise_on_error=True,
+                    consumer=consumer)
+        return dependency_tree_generator.format_result([command.result], output_format)
+
+    @staticmethod
+    async def scan_and_find_dependencies_async(ecosystem, manifests, show_transitive,
+                                               executor=None, output_format=OUTPUT_FORMAT_LEGACY,
+                                               cache=None, node_records=False,
+                                               generator_options=None, semaphore=None):
+        """Scan the dependencies files to fetch transitive deps, without blocking the event loop.
+
+        Every manifest is parsed by the executor, at most MAX_CONCURRENT_MANIFEST_PARSES
+        at once across all scans running in the event loop, unless a semaphore is given.
+        Cancelling the scan cancels the parses which have not started yet, the running
+        ones are left to finish in the executor. Arguments are the same as for
+        scan_and_find_dependencies().
+
+        :param executor: concurrent.futures.Executor, parse manifests with this executor,
+                         default: the default executor of the event loop (threads). Use a
+                         ProcessPoolExecutor to keep CPU heavy manifests off the loop's process.
+        :param semaphore: asyncio.Semaphore, bounds the number of concurrent parses
+        :return: dict, dependency tree
+        """
         if type(show_transitive) is not bool:
             show_transitive = show_transitive == "true"
-        dependency_tree_generator = get_dependency_tree_generator(ecosystem)()
-        return dependency_tree_generator.get_dependencies(manifests, show_transitive)
+        # get_event_loop() returns the running loop when called from a coroutine.
+        loop = asyncio.get_event_loop()
+        if semaphore is None:
+            semaphore = _get_parse_semaphore(loop)
+        get_cached = functools.partial(DependencyFinder._get_cached, ecosystem, manifests,
+                                       show_transitive, cache, node_records, generator_options)
+        if cache is None:
+            details, keys, pending = get_cached()
+        else:
+            # Hashing manifests and cache I/O block, they run in the default executor of
+            # the loop, as caches are not shared with processes of a given executor.
+            details, keys, pending = await loop.run_in_executor(None, get_cached)
+
+        async def parse(index):
+            async with semaphore:
+                dep = await loop.run_in_executor(executor, functools.partial(
+                    _get_manifest_details, ecosystem, manifests[index], show_transitive,
+                    node_records, generator_options))
+            details[index] = dep
+            if keys[index] is not None:
+                await loop.run_in_executor(None, DependencyFinder._set_cached, cache,
+                                           keys[index], dep)
+
+        if pending:
+            await asyncio.gather(*[parse(index) for index in pending])
+        return get_dependency_tree_generator(ecosystem).format_result(details, output_format)
+
+    @staticmethod
+    def _get_cached(ecosystem, manifests, show_transitive, cache, node_records,
+                    generator_options):
+        """Look manifests up in the cache.
+
+        :return: tuple (list of details, None for manifests not cached, list of cache keys,
+                 list of indexes of manifests to be resolved)
+        """
+        details = [None] * len(manifests)
+        keys = [None] * len(manifests)
+        pending = []
+        for index, manifest in enumerate(manifests):
+            if cache is not None:
+                keys[index] = _get_cache_key(ecosystem, manifest, show_transitive,
+                                             node_records, generator_options)
+                cached = cache.get(keys[index]) if keys[index] is not None else None
+                if cached is not None:
+                    details[index] = DependencyFinder._get_cached_details(
+                        ecosystem, manifest, cached)
+                    continue
+            pending.append(index)
+        return details, keys, pending
+
+    @staticmethod
+    def _set_cached(cache, key, dep):
+        """Cache resolved manifest details, when the manifest has a cache key."""
+        if key is not None:
+            # Pickled, so that callers never share mutable trees with the cache.
+            cached = {name: value for name, value in dep.items() if name.startswith('_')}
+            cache.set(key, pickle.dumps(cached, pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def _get_cached_details(ecosystem, manifest, cached):
+        """Build manifest details from cached resolved dependencies."""
+        dep = {
+            "ecosystem": ecosystem,
+            "manifest_file_path": manifest['filepath'],
+            "manifest_file": manifest['filename']
+        }
+        dep.update(pickle.loads(cached))
+        return dep
 
     @staticmethod
     def clean_version(version):
         """Clean Version."""
         # TODO: Remove caller from Component Analyses for Golang.
         return GoTree.clean_version(version)
+
+    @staticmethod
+    def clean_versions(versions):
+        """Clean Versions in bulk, sharing the memo cache with clean_version()."""
+        return GoTree.clean_versions(versions)
@@ -0,0 +1,143 @@
+"""Resolution of transitive dependencies and the graph output format of dependency trees."""
+
+
+def build_graph(details):
+    """Convert the manifest details into a deduplicated node table and edge lists.
+
+    :param details: list of manifest details with flattened "_resolved" trees
+    :return: dict in format ({"nodes": [{id, package, version}],
+             "manifests": [{ecosystem, manifest_file_path, manifest_file, direct, edges}]})
+    """
+    nodes = []
+    ids = {}
+
+    def node_id(item):
+        if not isinstance(item, dict):
+            item = item.to_dict()
+        key = (item.get('package'), item.get('version'))
+        if key not in ids:
+            ids[key] = len(nodes)
+            node = {k: v for k, v in item.items() if k != 'deps'}
+            node['id'] = ids[key]
+            nodes.append(node)
+        return ids[key]
+
+    manifests = []
+    for dep in details:
+        manifest = {k: v for k, v in dep.items() if k != '_resolved'}
+        direct = []
+        edges = []
+        for item in dep.get('_resolved') or []:
+            direct_id = node_id(item)
+            direct.append(direct_id)
+            for transitive in item.get('deps') or []:
+                edges.append([direct_id, node_id(transitive)])
+        manifest['direct'] = direct
+        manifest['edges'] = edges
+        manifests.append(manifest)
+    return {"nodes": nodes, "manifests": manifests}
+
+
+class TransitiveResolver:
+    """Resolve transitive closures of a dependency graph.
+
+    Each closure is a depth-first, pre-order walk over the adjacency map, which
+    visits every node at most once per root and therefore terminates on cycles.
+    Closures computed for earlier roots are reused when a later walk reaches
+    them, as long as the reused closure cannot lead back into the active path.
+    """
+
+    def __init__(self, graph, reverse=False, max_depth=None):
+        """Init function for default value.
+
+        :param graph: dict, adjacency map in format ({n1: [n2, n3]})
+        :param reverse: bool, walk the children of each node in reverse order
+        :param max_depth: int, only report nodes at most this many edges below the root
+        """
+        self._graph = graph
+        self._reverse = reverse
+        self._max_depth = max_depth
+        self._closures = {}
+        self._closure_sets = {}
+
+    def _children(self, node):
+        """Return an iterator over direct children of the node."""
+        children = self._graph.get(node, ())
+        return reversed(children) if self._reverse else iter(children)
+
+    def closure(self, root):
+        """Return list of all nodes reachable from the root, excluding the root."""
+        if root in self._closures:
+            return self._closures[root]
+        if self._max_depth is not None:
+            self._closures[root] = self._bounded_closure(root)
+            return self._closures[root]
+
+        order = []
+        visited = {root}
+        active = {root}
+        stack = [(root, self._children(root))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child in visited:
+                    continue
+                visited.add(child)
+                order.append(child)
+                known = self._closures.get(child)
+                if known is not None and active.isdisjoint(self._closure_sets[child]):
+                    # Closure of the child is complete and acyclic w.r.t. the active path.
+                    for item in known:
+                        if item not in visited:
+                            visited.add(item)
+                            order.append(item)
+                    continue
+                active.add(child)
+                stack.append((child, self._children(child)))
+                break
+            else:
+                stack.pop()
+                active.discard(node)
+
+        self._closures[root] = order
+        self._closure_sets[root] = visited
+        return order
+
+    def _bounded_closure(self, root):
+        """Return list of nodes at most max_depth edges below the root, excluding the root.
+
+        A node reached again over a shorter path is expanded again, as more of its
+        descendants fit within the depth limit then, but it is reported only once.
+        """
+        order = []
+        depths = {root: 0}
+        stack = [(0, self._children(root))] if self._max_depth > 0 else []
+        while stack:
+            depth, children = stack[-1]
+            for child in children:
+                known = depths.get(child)
+                if known is not None and known <= depth + 1:
+                    continue
+                if known is None:
+                    order.append(child)
+                depths[child] = depth + 1
+                if depth + 1 < self._max_depth:
+                    stack.append((depth + 1, self._children(child)))
+                    break
+            else:
+                stack.pop()
+        return order
+
+
+def resolve_maven_module(final_map, intermediate_map, max_depth=None):
+    """Resolve closures of direct dependencies of one Maven module.
+
+    Module level, so that modules can be resolved in worker processes.
+
+    :param final_map: dict, direct dependencies of the module as keys
+    :param intermediate_map: dict, adjacency map of the module graph
+    :param max_depth: int, only resolve transitives at most this many edges below direct deps
+    :return: Tree in format ({d1:[t1, t2]})
+    """
+    resolver = TransitiveResolver(intermediate_map, reverse=True, max_depth=max_depth)
+    return {key: resolver.closure(key) for key in final_map}
@@ -0,0 +1,97 @@
+"""Compact node records of resolved dependencies, shared by all dependency trees."""
+
+import sys
+from functools import lru_cache
+
+# Upper bound of distinct (package, version) node records kept interned in memory.
+DEPENDENCY_NODE_CACHE_SIZE = 1 << 16
+
+
+class DependencyNode:
+    """Compact immutable record of a resolved transitive dependency.
+
+    Records are interned, so that every tree shares them; changing one would change
+    all trees, hence attributes cannot be set once the record is created.
+    """
+
+    __slots__ = ('package', 'version')
+
+    def __init__(self, package, version):
+        """Init function for default value."""
+        object.__setattr__(self, 'package', package)
+        object.__setattr__(self, 'version', version)
+
+    def __setattr__(self, name, value):
+        """Refuse to change the record."""
+        raise AttributeError('{c} is immutable'.format(c=type(self).__name__))
+
+    def __delattr__(self, name):
+        """Refuse to change the record."""
+        raise AttributeError('{c} is immutable'.format(c=type(self).__name__))
+
+    def __reduce__(self):
+        """Pickle the record by its constructor arguments, as attributes cannot be set."""
+        return type(self), self._key()
+
+    def _key(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        """Compare nodes of the same type by value."""
+        return type(self) is type(other) and self._key() == other._key()
+
+    def __hash__(self):
+        """Hash the node by value."""
+        return hash(self._key())
+
+    def __repr__(self):
+        """Return the representation of the node."""
+        return '{c}{k!r}'.format(c=type(self).__name__, k=self._key())
+
+    def to_dict(self):
+        """Return the dictionary representation of the node."""
+        return {"package": self.package, "version": self.version}
+
+
+class GolangDependencyNode(DependencyNode):
+    """Compact immutable record of a resolved Golang dependency."""
+
+    __slots__ = ('from_', 'given_version', 'is_semver')
+
+    def __init__(self, from_, package, given_version, is_semver, version):
+        """Init function for default value."""
+        super().__init__(package, version)
+        object.__setattr__(self, 'from_', from_)
+        object.__setattr__(self, 'given_version', given_version)
+        object.__setattr__(self, 'is_semver', is_semver)
+
+    def _key(self):
+        # Same order as the arguments of __init__(), see __reduce__().
+        return self.from_, self.package, self.given_version, self.is_semver, self.version
+
+    def to_dict(self):
+        """Return the dictionary representation of the node."""
+        return {
+            'from': self.from_,
+            'package': self.package,
+            'given_version': self.given_version,
+            'is_semver': self.is_semver,
+            'version': self.version
+        }
+
+
+def node_to_dict(obj):
+    """Convert a node record to a dictionary.
+
+    Meant as the serialization boundary of trees built with node_records, e.g.
+    json.dumps(tree, default=node_to_dict).
+    """
+    if isinstance(obj, DependencyNode):
+        return obj.to_dict()
+    raise TypeError('Object of type {t} is not a dependency node'.format(t=type(obj).__name__))
+
+
+@lru_cache(maxsize=DEPENDENCY_NODE_CACHE_SIZE)
+def dependency_node(package, version):
+    """Return the interned node record of the (package, version) pair."""
+    return DependencyNode(sys.intern(package), sys.intern(version))
@@ -20,7 +20,7 @@
 import re
 import random
 import logging
-import requests
+from f8a_utils import http_client
 from os import environ
 from datetime import datetime
 import base64
@@ -63,7 +63,7 @@ class GithubUtils:
                 'Authorization': 'token {t}'.format(t=token)
             }
         try:
-            response = requests.get(url, headers=headers)
+            response = http_client.get(url, headers=headers)
             if response.status_code != 200:
                 _logger.error("Error Code: {}".format(response.status_code))
                 return None
@@ -0,0 +1,89 @@
+"""Process wide, connection pooled HTTP session shared by all outbound calls."""
+
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from f8a_utils.default_config import HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, \
+    HTTP_HOST_POOL_MAXSIZE, HTTP_MAX_RETRIES, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+_logger = logging.getLogger(__name__)
+
+_session = None
+_session_pid = None
+_lock = threading.Lock()
+
+
+class _Session(requests.Session):
+    """Session applying the default timeouts to requests without their own."""
+
+    def request(self, method, url, **kwargs):
+        """Send the request, with the default timeouts unless it has its own."""
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        return super().request(method, url, **kwargs)
+
+
+def _parse_host_pool_sizes(value):
+    """Parse "host=size,host=size" into a dict."""
+    sizes = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        host, _, size = item.partition('=')
+        try:
+            sizes[host.strip()] = int(size)
+        except ValueError:
+            _logger.error('Invalid HTTP pool size {i}, ignoring it'.format(i=item))
+    return sizes
+
+
+def _create_session():
+    """Create session with pooled adapters, hosts listed in HTTP_HOST_POOL_MAXSIZE get their own."""
+    session = _Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                          max_retries=HTTP_MAX_RETRIES)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    for host, size in _parse_host_pool_sizes(HTTP_HOST_POOL_MAXSIZE).items():
+        # Longest matching prefix wins, the slash keeps e.g. pypi.org.example.com out.
+        session.mount('https://{h}/'.format(h=host), HTTPAdapter(
+            pool_connections=1, pool_maxsize=size, max_retries=HTTP_MAX_RETRIES))
+    return session
+
+
+def get_session():
+    """Return the shared session, thread safe.
+
+    Connections must not be shared with forked processes, so a new session is
+    created when the process id changes.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _lock:
+            if _session is None or _session_pid != pid:
+                _session = _create_session()
+                _session_pid = pid
+    return _session
+
+
+def get(url, **kwargs):
+    """Send GET request with the shared session, accepting the arguments of requests.get."""
+    return get_session().get(url, **kwargs)
+
+
+def _reset_after_fork():
+    """Drop the parent's session and lock, which may be held by a thread not forked along."""
+    global _session, _session_pid, _lock
+    _session = None
+    _session_pid = None
+    _lock = threading.Lock()
+
+
+# os.register_at_fork() is available since Python 3.7, the pid check covers older ones.
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
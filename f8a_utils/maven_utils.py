@@ -19,7 +19,7 @@
 
 from lxml import etree
 import logging
-from urllib.request import urlopen
+from f8a_utils import http_client
 from f8a_version_comparator.comparable_version import ComparableVersion
 from f8a_utils.web_scraper import Scraper
 
@@ -84,7 +84,10 @@ class MavenUtils:
                 url = 'https://repo.maven.apache.org/maven2/{g}/{a}/{f}'.format(
                     g=g, a=a, f=filename)
                 try:
-                    metadata_xml = etree.parse(urlopen(url))
+                    response = http_client.get(url)
+                    # requests.HTTPError is an OSError too
+                    response.raise_for_status()
+                    metadata_xml = etree.fromstring(response.content)
                     ok = True  # We successfully downloaded the file
                     version_elements = metadata_xml.findall('.//version')
                     version = metadata_xml.find('.//release').text if \
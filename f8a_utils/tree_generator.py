@@ -1,116 +1,279 @@
 """Definition of a Tree Generator Modal of All Ecosystems."""
 
+import io
 import json
+import os
+import sys
 from abc import ABC
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from functools import lru_cache
 import semver
+from f8a_utils.dependency_graph import TransitiveResolver, build_graph, resolve_maven_module
+from f8a_utils.dependency_nodes import GolangDependencyNode, dependency_node
+
+# Output formats of the dependency tree.
+# legacy: one details entry per manifest, each listing all manifests resolved so far.
+OUTPUT_FORMAT_LEGACY = 'legacy'
+# compact: a single details entry listing every manifest exactly once.
+OUTPUT_FORMAT_COMPACT = 'compact'
+# graph: a table of unique nodes plus direct dependencies and edges per manifest.
+OUTPUT_FORMAT_GRAPH = 'graph'
+
+# Upper bound of distinct coordinate strings kept parsed in memory.
+MAVEN_COORDINATES_CACHE_SIZE = 1 << 16
+
+# Upper bound of distinct Golang versions kept cleaned in memory.
+GOLANG_VERSION_CACHE_SIZE = 1 << 16
+
+_MAVEN_COORDINATES_FIELDS = ('groupId', 'artifactId', 'packaging', 'version', 'classifier', 'scope')
+
+
+class MavenCoordinates(namedtuple('MavenCoordinates', _MAVEN_COORDINATES_FIELDS + ('package',))):
+    """Parsed Maven coordinates, package is the interned "groupId:artifactId" string."""
+
+    __slots__ = ()
 
 
 class DependencyTreeGenerator(ABC):
     """Abstract class for Dependency Finderq."""
 
-    @staticmethod
-    def get_dependencies(manifests, show_transitive):
+    def __init__(self, node_records=False):
+        """Init function for default value.
+
+        :param node_records: bool, report transitive dependencies as interned, immutable
+                             node records instead of dictionaries,
+                             see f8a_utils.dependency_nodes.node_to_dict()
+        """
+        self.node_records = node_records
+
+    def _make_node(self, package, version):
+        """Return the transitive dependency node in the configured representation."""
+        if self.node_records:
+            return dependency_node(package, version)
+        return {"package": package, "version": version}
+
+    def get_dependencies(self, manifests, show_transitive, output_format=OUTPUT_FORMAT_LEGACY):
         """Make Ecosystem Tree."""
+        details = [self.get_manifest_details(manifest, show_transitive)
+                   for manifest in manifests]
+        return self.format_result(details, output_format)
+
+    def get_manifest_details(self, manifest, show_transitive):
+        """Make Ecosystem Tree of a single manifest."""
         pass
 
+    @staticmethod
+    def format_result(details, output_format=OUTPUT_FORMAT_LEGACY):
+        """Wrap the manifest details into the result of given output format."""
+        if output_format == OUTPUT_FORMAT_COMPACT:
+            return {"result": [{"details": details}]}
+        if output_format == OUTPUT_FORMAT_LEGACY:
+            # Serializes all manifests once per manifest, kept for existing consumers.
+            return {"result": [{"details": details} for _ in details]}
+        if output_format == OUTPUT_FORMAT_GRAPH:
+            return build_graph(details)
+        raise ValueError('Unsupported output format: {f}'.format(f=output_format))
+
     @staticmethod
     def _parse_transitives(*args):                # noqa
         """func. for calculating transitives."""
         pass
 
+    @staticmethod
+    def _iter_lines(content):
+        """Iterate lazily over lines of manifest content.
+
+        :param content: str or bytes blob, path to a file (os.PathLike),
+                        text or binary file object, or an iterable of lines
+        :return: iterator over str lines
+        """
+        if isinstance(content, bytes):
+            content = io.TextIOWrapper(io.BytesIO(content), encoding='utf-8')
+        elif isinstance(content, str):
+            content = io.StringIO(content)
+        elif isinstance(content, os.PathLike):
+            with open(content, encoding='utf-8') as fd:
+                yield from fd
+            return
+
+        for line in content:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            yield line
+
+    @staticmethod
+    def _load_json(content):
+        """Load JSON manifest content, accepting the same types as _iter_lines().
+
+        JSON documents cannot be parsed incrementally, so streamed content is buffered.
+        """
+        if isinstance(content, bytes):
+            content = content.decode("utf-8")
+        if isinstance(content, str):
+            return json.loads(content)
+        if isinstance(content, os.PathLike):
+            with open(content, encoding='utf-8') as fd:
+                return json.load(fd)
+        return json.loads(''.join(DependencyTreeGenerator._iter_lines(content)))
+
 
 class MavenDependencyTreeGenerator(DependencyTreeGenerator):
     """Generate Maven Dependency Tree."""
 
-    def get_dependencies(self, manifests: list, show_transitive: bool) -> dict:
-        """Scan the maven dependencies files and fetch transitive deps."""
-        deps = {}
-        result = []
-        details = []
-        for manifest in manifests:
-            dep = {
-                "ecosystem": "maven",
-                "manifest_file_path": manifest['filepath'],
-                "manifest_file": manifest['filename']
+    def __init__(self, node_records=False, per_module=False, executor=None,
+                 scopes=None, max_depth=None):
+        """Init function for default value.
+
+        :param node_records: bool, report transitive dependencies as node records
+        :param per_module: bool, report resolved dependencies of every module (digraph
+                           block) under "_modules" in addition to the merged "_resolved"
+        :param executor: concurrent.futures.Executor, resolve modules with this executor
+        :param scopes: iterable of scopes (e.g. compile, runtime) to include, dependencies
+                       of other scopes are dropped while the graph is read, so their
+                       subtrees are never resolved. Default: only test scoped direct
+                       dependencies are skipped.
+        :param max_depth: int, only resolve transitives at most this many edges below
+                          direct dependencies, 0 resolves none. Default: no limit.
+        """
+        super().__init__(node_records)
+        self.per_module = per_module
+        self.executor = executor
+        self.scopes = frozenset(scopes) if scopes is not None else None
+        # Dependencies without scope are kept, as Maven applies the default one.
+        self._included_scopes = self.scopes | {''} if scopes is not None else None
+        self.max_depth = max_depth
+
+    def get_manifest_details(self, manifest: dict, show_transitive: bool) -> dict:
+        """Scan the maven dependencies file and fetch transitive deps."""
+        dep = {
+            "ecosystem": "maven",
+            "manifest_file_path": manifest['filepath'],
+            "manifest_file": manifest['filename']
+        }
+        module_trees = self._get_module_trees(manifest['content'])
+        dep['_resolved'] = self._get_resolved(self._merge_trees(module_trees), show_transitive)
+        if self.per_module:
+            dep['_modules'] = [{
+                "module": module,
+                "_resolved": self._get_resolved(tree, show_transitive)
+            } for module, tree in module_trees.items()]
+        return dep
+
+    def _get_resolved(self, tree: dict, show_transitive: bool) -> list:
+        """Add meta data to generated tree."""
+        resolved = []
+        for direct, transitives in tree.items():
+            coordinates = self._parse_coordinates(direct)
+            if coordinates.scope == 'test' and self.scopes is None:
+                # Don't process Test Dependencies.
+                continue
+            trans_list = []
+            if show_transitive:
+                trans_list = self._parse_transitives(transitives)
+            tmp_json = {
+                "package": coordinates.package,
+                "version": coordinates.version,
+                "deps": trans_list
             }
-            resolved = []
-            data = manifest['content']
-
-            if isinstance(data, bytes):
-                data = data.decode("utf-8")
-
-            tree = self._get_dependency_tree(data)
-            for direct, transitives in tree.items():
-                # Add meta data to generated tree.
-                parsed_json = self._parse_string(direct)
-                if parsed_json['scope'] == 'test':
-                    # Don't process Test Dependencies.
-                    continue
-                trans_list = []
-                if show_transitive:
-                    trans_list = self._parse_transitives(transitives)
-                tmp_json = {
-                    "package": parsed_json['groupId'] + ":" + parsed_json['artifactId'],
-                    "version": parsed_json['version'],
-                    "deps": trans_list
-                }
-                resolved.append(tmp_json)
-            dep['_resolved'] = resolved
-            details.append(dep)
-            details_json = {"details": details}
-            result.append(details_json)
-
-        deps['result'] = result
-        return deps
+            resolved.append(tmp_json)
+        return resolved
 
     def _parse_transitives(self, transitives: list) -> list:
         """Scan the maven transitives."""
         trans_list = []
         for transitive in transitives:
-            parsed_json = self._parse_string(transitive)
-            tmp_json = {
-                "package": parsed_json['groupId'] + ":" + parsed_json['artifactId'],
-                "version": parsed_json['version']
-            }
-            trans_list.append(tmp_json)
+            coordinates = self._parse_coordinates(transitive)
+            trans_list.append(self._make_node(coordinates.package, coordinates.version))
         return trans_list
 
-    def _get_dependency_tree(self, content: str) -> dict:
-        """Build Dependency Tree.
+    def _get_dependency_tree(self, content) -> dict:
+        """Build Dependency Tree, merged over all modules.
 
-        :param content: file contents from dependency.txt
+        :param content: file contents from dependency.txt, see _iter_lines() for accepted types
         :return: Tree in format ({d1:[t1, t2]})
         """
+        return self._merge_trees(self._get_module_trees(content))
+
+    def _get_module_trees(self, content) -> dict:
+        """Build Dependency Tree of every module.
+
+        Every digraph block of a reactor build is resolved on its own graph, so edges
+        of one module never leak into another. Blocks are resolved as soon as they
+        are read, or concurrently when the generator has an executor.
+
+        :param content: file contents from dependency.txt, see _iter_lines() for accepted types
+        :return: Trees in format ({module: {d1:[t1, t2]}})
+        """
+        module_trees = {}
+        module = ''
         final_map = {}
         intermediate_map = defaultdict(list)
-        module = ''
-        for line in content.split("\n"):
+
+        def resolve():
+            if not final_map:
+                return
+            if self.executor is not None:
+                tree = self.executor.submit(
+                    resolve_maven_module, final_map, intermediate_map, self.max_depth)
+            else:
+                tree = resolve_maven_module(final_map, intermediate_map, self.max_depth)
+            module_trees.setdefault(module, []).append(tree)
+
+        for line in self._iter_lines(content):
             if '->' in line:
                 # line = line.replace('"', '').replace(';', '').strip()
                 prefix, suffix = line.split('->')
-                prefix = prefix.replace('"', '').replace(';', '').strip()
-                suffix = suffix.replace('"', '').replace(';', '').strip()
+                # Interned, so that the graph holds a single copy of every coordinate.
+                prefix = sys.intern(prefix.replace('"', '').replace(';', '').strip())
+                suffix = sys.intern(suffix.replace('"', '').replace(';', '').strip())
 
-                prefix, suffix = prefix, suffix.strip('\n')
+                if self._included_scopes is not None and \
+                        self._parse_coordinates(suffix).scope not in self._included_scopes:
+                    continue
                 if prefix == module:
                     final_map[suffix] = []
                 else:
                     intermediate_map[prefix].append(suffix)
-            else:
+            elif '"' in line:
+                # Start of the next digraph block.
+                resolve()
                 module = line[line.find('"') + 1:line.rfind('"')]
+                final_map = {}
+                intermediate_map = defaultdict(list)
+        resolve()
+
+        for module, trees in module_trees.items():
+            if self.executor is not None:
+                trees = [tree.result() for tree in trees]
+            module_trees[module] = self._merge_trees(dict(enumerate(trees)))
+        return module_trees
 
-        for key in final_map.keys():
-            values = intermediate_map[key]
-            while len(values) != 0:
-                next_key = values.pop()
-                final_map[key].append(next_key)
-                values.extend(intermediate_map[next_key])
+    @staticmethod
+    def _merge_trees(trees: dict) -> dict:
+        """Merge trees, keeping the first occurrence order of direct and transitive deps."""
+        if len(trees) == 1:
+            return next(iter(trees.values()))
+        final_map = {}
+        for tree in trees.values():
+            for direct, transitives in tree.items():
+                if direct not in final_map:
+                    final_map[direct] = transitives
+                    continue
+                known = set(final_map[direct])
+                final_map[direct] = final_map[direct] + [
+                    transitive for transitive in transitives if transitive not in known]
         return final_map
 
     @staticmethod
     def _parse_string(coordinates_str):
         """Parse string representation into a dictionary."""
+        coordinates = MavenDependencyTreeGenerator._parse_coordinates(coordinates_str)
+        return dict(zip(_MAVEN_COORDINATES_FIELDS, coordinates))
+
+    @staticmethod
+    @lru_cache(maxsize=MAVEN_COORDINATES_CACHE_SIZE)
+    def _parse_coordinates(coordinates_str):
+        """Parse string representation into MavenCoordinates, cached per distinct string."""
         a = {'groupId': '',
              'artifactId': '',
              'packaging': '',
@@ -136,143 +299,237 @@ class MavenDependencyTreeGenerator(DependencyTreeGenerator):
         else:
             raise ValueError('Invalid Maven coordinates %s', coordinates_str)
 
-        return a
+        return MavenCoordinates(
+            package=sys.intern(a['groupId'] + ":" + a['artifactId']),
+            **{key: sys.intern(value) for key, value in a.items()})
 
 
 class NpmDependencyTreeGenerator(DependencyTreeGenerator):
     """Generate NPM Dependency Tree."""
 
-    def get_dependencies(self, manifests, show_transitive):
-        """Scan the npm dependencies files to fetch transitive deps."""
-        deps = {}
-        result = []
-        details = []
-        for manifest in manifests:
-            dep = {
-                "ecosystem": "npm",
-                "manifest_file_path": manifest['filepath'],
-                "manifest_file": manifest['filename']
-            }
-
-            data = manifest['content']
-
-            if isinstance(data, bytes):
-                data = data.decode("utf-8")
-
-            dependencies = json.loads(data).get('dependencies')
-            resolved = []
-            if dependencies:
-                for key, val in dependencies.items():
-                    version = val.get('version') or val.get('required').get('version')
-                    if version:
-                        transitive = []
-                        if show_transitive is True:
-                            tr_deps = val.get('dependencies') or \
-                                      val.get('required', {}).get('dependencies')
-                            if tr_deps:
-                                transitive = self._parse_transitives(transitive, tr_deps)
-                        tmp_json = {
-                            "package": key,
-                            "version": version,
-                            "deps": transitive
-                        }
-                        resolved.append(tmp_json)
-            dep['_resolved'] = resolved
-            details.append(dep)
-            details_json = {"details": details}
-            result.append(details_json)
-        deps['result'] = result
-        return deps
+    def get_manifest_details(self, manifest, show_transitive):
+        """Scan the npm dependencies file to fetch transitive deps."""
+        dep = {
+            "ecosystem": "npm",
+            "manifest_file_path": manifest['filepath'],
+            "manifest_file": manifest['filename']
+        }
 
-    def _parse_transitives(self, transitive, content):
-        """Scan the npm dependencies recursively to fetch transitive deps."""
-        if content:
-            for key, val in content.items():
+        content = self._load_json(manifest['content'])
+        dependencies = content.get('dependencies')
+        resolved = []
+        if content.get('lockfileVersion', 1) >= 2 and content.get('packages'):
+            # Flat package-lock.json v2/v3, no `npm list` output needed.
+            resolved = self._get_lockfile_dependencies(content['packages'], show_transitive)
+        elif dependencies:
+            for key, val in dependencies.items():
                 version = val.get('version') or val.get('required').get('version')
                 if version:
+                    transitive = []
+                    if show_transitive is True:
+                        tr_deps = val.get('dependencies') or \
+                                  val.get('required', {}).get('dependencies')
+                        if tr_deps:
+                            transitive = self._parse_transitives(transitive, tr_deps)
                     tmp_json = {
                         "package": key,
-                        "version": version
+                        "version": version,
+                        "deps": transitive
                     }
-                    transitive.append(tmp_json)
-                    tr_deps = val.get('dependencies') or val.get('required', {}).get('dependencies')
-                    if tr_deps:
-                        transitive = self._parse_transitives(transitive, tr_deps)
+                    resolved.append(tmp_json)
+        dep['_resolved'] = resolved
+        return dep
+
+    def _parse_transitives(self, transitive, content):
+        """Scan the npm dependencies to fetch transitive deps.
+
+        Nested dependencies are walked with an explicit stack in pre-order, and every
+        (package, version) pair is reported only once, at its first occurrence.
+        """
+        seen = {(tr['package'], tr['version']) if isinstance(tr, dict) else (tr.package, tr.version)
+                for tr in transitive}
+        stack = [iter(content.items())] if content else []
+        while stack:
+            for key, val in stack[-1]:
+                version = val.get('version') or val.get('required').get('version')
+                if not version:
+                    continue
+                if (key, version) not in seen:
+                    seen.add((key, version))
+                    transitive.append(self._make_node(key, version))
+                tr_deps = val.get('dependencies') or val.get('required', {}).get('dependencies')
+                if tr_deps:
+                    stack.append(iter(tr_deps.items()))
+                    break
+            else:
+                stack.pop()
         return transitive
 
+    def _get_lockfile_dependencies(self, packages, show_transitive):
+        """Build the dependency tree from the "packages" map of a v2/v3 package-lock.json.
+
+        The map is keyed by install path, so it doubles as the index used to resolve
+        requirements the way node does, walking up the node_modules hierarchy.
+        Development dependencies of the root project are not reported.
+
+        :param packages: dict, "packages" map of the lockfile
+        :param show_transitive: bool, resolve transitive dependencies
+        :return: list of direct dependencies in format ({package, version, deps})
+        """
+        graph = {}
+        for path, entry in packages.items():
+            if entry.get('link'):
+                target = entry.get('resolved')
+                graph[path] = [target] if target in packages else []
+                continue
+            requirements = list(entry.get('dependencies', {})) + \
+                list(entry.get('optionalDependencies', {}))
+            if path:
+                requirements.extend(entry.get('peerDependencies', {}))
+            children = []
+            for name in requirements:
+                child = self._resolve_lockfile_path(packages, path, name)
+                if child is not None:
+                    children.append(child)
+            graph[path] = children
+
+        resolver = TransitiveResolver(graph)
+        resolved = []
+        for direct in graph.get('', ()):
+            package, version = self._get_lockfile_package(packages, direct)
+            if not version:
+                continue
+            transitive = []
+            if show_transitive is True:
+                seen = {(package, version)}
+                for path in resolver.closure(direct):
+                    node = self._get_lockfile_package(packages, path)
+                    if node[1] and node not in seen and not packages[path].get('link'):
+                        seen.add(node)
+                        transitive.append(self._make_node(*node))
+            resolved.append({
+                "package": package,
+                "version": version,
+                "deps": transitive
+            })
+        return resolved
+
+    @staticmethod
+    def _resolve_lockfile_path(packages, path, name):
+        """Find install path of the name required from the given path, None if not installed."""
+        while True:
+            candidate = path + '/node_modules/' + name if path else 'node_modules/' + name
+            if candidate in packages:
+                return candidate
+            if not path:
+                return None
+            index = path.rfind('/node_modules/')
+            path = path[:index] if index != -1 else ''
+
+    @staticmethod
+    def _get_lockfile_package(packages, path):
+        """Return (package, version) of the entry installed at path, following links."""
+        entry = packages.get(path, {})
+        if entry.get('link'):
+            entry = packages.get(entry.get('resolved'), {})
+        index = path.rfind('node_modules/')
+        if index != -1:
+            name = path[index + len('node_modules/'):]
+        else:
+            name = entry.get('name', path)
+        return name, entry.get('version')
+
 
 class PypiDependencyTreeGenerator(DependencyTreeGenerator):
     """Generate Pypi Dependency Tree."""
 
-    def get_dependencies(self, manifests, show_transitive):
-        """Scan the Pypi dependencies files to fetch transitive deps."""
-        result = []
-        details = []
-        deps = {}
-        for manifest in manifests:
-            dep = {
-                "ecosystem": "pypi",
-                "manifest_file_path": manifest['filepath'],
-                "manifest_file": manifest['filename']
-            }
-            data = manifest['content']
-
-            if isinstance(data, bytes):
-                data = data.decode("utf-8")
-            content = json.loads(data)
-            dep['_resolved'] = content
-            details.append(dep)
-            details_json = {"details": details}
-            result.append(details_json)
-        deps['result'] = result
-        return deps
+    def get_manifest_details(self, manifest, show_transitive):
+        """Scan the Pypi dependencies file to fetch transitive deps."""
+        dep = {
+            "ecosystem": "pypi",
+            "manifest_file_path": manifest['filepath'],
+            "manifest_file": manifest['filename']
+        }
+        content = self._load_json(manifest['content'])
+        if self.node_records:
+            for direct in content:
+                direct['deps'] = [self._make_node(tr['package'], tr['version'])
+                                  for tr in direct.get('deps') or []]
+        dep['_resolved'] = content
+        return dep
 
 
 class GolangDependencyTreeGenerator(DependencyTreeGenerator):
     """Generate Golang Dependency Tree."""
 
-    def get_dependencies(self, manifests, show_transitive):
-        """Check Go Lang Dependencies."""
-        details = []
-        final = {}
-        result = []
-        for manifest in manifests:
-            dep = {
-                "ecosystem": "golang",
-                "manifest_file_path": manifest['filepath'],
-                "manifest_file": manifest['filename']
-            }
-            resolved = []
-            direct_dep_list = []
-            dependencies = self._clean_dependencies(manifest['content'])
-            for dependency in dependencies:
-                # Find out Direct Dependencies listed against Module Package.
-                prefix, direct_dep = dependency.strip().split(" ")
-                if '@' not in prefix and (direct_dep not in direct_dep_list):
-                    # Only Module Packages have no @ in Prefix.
-                    parsed_json = self._parse_string(direct_dep)
-                    transitive_list = []
-                    trans = []
-                    if show_transitive:
-                        transitive_list = self._parse_transitives(
-                            dependencies, transitive_list, direct_dep, trans)
-                    parsed_json["deps"] = transitive_list
-                    resolved.append(parsed_json)
-            dep['_resolved'] = resolved
-            details.append(dep)
-        result.append({"details": details})
-        final["result"] = result
-        return final
-
-    def _parse_transitives(self, data, transitive, suffix, trans):
-        """Scan the golang transitive deps."""
-        for line in data:
-            pref, suff = line.strip().split(" ")
-            if pref == suffix and suff not in trans:
-                trans.append(suff)
-                parsed_json = self._parse_string(suff)
-                transitive.append(parsed_json)
-                transitive = self._parse_transitives(data, transitive, suff, trans)
+    def get_manifest_details(self, manifest, show_transitive):
+        """Check Go Lang Dependencies of a single manifest."""
+        dep = {
+            "ecosystem": "golang",
+            "manifest_file_path": manifest['filepath'],
+            "manifest_file": manifest['filename']
+        }
+        resolved = []
+        graph, direct_dep_list = self._index_dependencies(
+            self._clean_dependencies(manifest['content']))
+        resolver = TransitiveResolver(graph)
+        parsed = {}
+        for direct_dep in direct_dep_list:
+            parsed_json = self._parse_string(direct_dep)
+            transitive_list = []
+            if show_transitive:
+                transitive_list = self._parse_transitives(
+                    resolver.closure(direct_dep), parsed)
+            parsed_json["deps"] = transitive_list
+            resolved.append(parsed_json)
+        dep['_resolved'] = resolved
+        return dep
+
+    @staticmethod
+    def format_result(details, output_format=OUTPUT_FORMAT_LEGACY):
+        """Wrap the manifest details, legacy Golang format is the compact one."""
+        if output_format == OUTPUT_FORMAT_LEGACY:
+            output_format = OUTPUT_FORMAT_COMPACT
+        return DependencyTreeGenerator.format_result(details, output_format)
+
+    @staticmethod
+    def _index_dependencies(dependencies):
+        """Index `go mod graph` lines into an adjacency map.
+
+        :param dependencies: iterable of "prefix suffix" lines
+        :return: tuple of adjacency map ({p1: [s1, s2]}) and list of direct dependencies
+        """
+        graph = defaultdict(list)
+        direct_dep_list = []
+        direct_deps = set()
+        for dependency in dependencies:
+            prefix, suffix = dependency.strip().split(" ")
+            prefix, suffix = sys.intern(prefix), sys.intern(suffix)
+            graph[prefix].append(suffix)
+            # Only Module Packages have no @ in Prefix.
+            if '@' not in prefix and suffix not in direct_deps:
+                direct_deps.add(suffix)
+                direct_dep_list.append(suffix)
+        return graph, direct_dep_list
+
+    def _parse_transitives(self, transitives, parsed):
+        """Scan the golang transitive deps.
+
+        :param transitives: list of transitive dependency strings
+        :param parsed: dict, already parsed dependency strings, shared across direct deps
+        :return: list of parsed transitive dependencies
+        """
+        transitive = []
+        for suff in transitives:
+            node = parsed.get(suff)
+            if node is None:
+                node = self._parse_string(suff)
+                if self.node_records:
+                    node = GolangDependencyNode(
+                        suff, sys.intern(node['package']), sys.intern(node['given_version']),
+                        node['is_semver'], sys.intern(node['version']))
+                parsed[suff] = node
+            transitive.append(node if self.node_records else dict(node))
         return transitive
 
     def _parse_string(self, deps_string):
@@ -297,21 +554,57 @@ class GolangDependencyTreeGenerator(DependencyTreeGenerator):
         return a
 
     @staticmethod
-    def _clean_dependencies(dependencies) -> list:
-        """Clean Golang Dep."""
+    def _clean_dependencies(dependencies):
+        """Clean Golang Dep.
+
+        :param dependencies: `go mod graph` output, see _iter_lines() for accepted types
+        :return: list of lines for str/bytes blobs, lazy iterator over lines otherwise
+        """
         if isinstance(dependencies, bytes):
             dependencies = dependencies.decode("utf-8")
+        if not isinstance(dependencies, str):
+            return GolangDependencyTreeGenerator._iter_dependencies(dependencies)
         dependencies = dependencies[:dependencies.rfind('\n')]
         if not dependencies:
             raise ValueError('Dependency list cannot be empty')
         return dependencies.split('\n')
 
     @staticmethod
+    def _iter_dependencies(content):
+        """Iterate over non-empty lines of streamed `go mod graph` output."""
+        empty = True
+        for line in DependencyTreeGenerator._iter_lines(content):
+            line = line.rstrip('\n')
+            if line.strip():
+                empty = False
+                yield line
+        if empty:
+            raise ValueError('Dependency list cannot be empty')
+
+    @staticmethod
+    @lru_cache(maxsize=GOLANG_VERSION_CACHE_SIZE)
     def clean_version(version):
-        """Clean Version."""
+        """Clean Version, memoized as the same (pseudo-)versions recur across graphs."""
         version = version.replace('v', '', 1)
-        is_semver = semver.VersionInfo.isvalid(version)
-        if is_semver:
+        try:
             version = str(semver.VersionInfo.parse(version))
+            is_semver = True
+        except ValueError:
+            is_semver = False
         version = version.split('+')[0]
         return is_semver, version
+
+    @staticmethod
+    def clean_versions(versions):
+        """Clean Versions in bulk, parsing each distinct version once.
+
+        :param versions: iterable of str versions
+        :return: list of (is_semver, version) tuples in input order
+        """
+        cleaned = {}
+        result = []
+        for version in versions:
+            if version not in cleaned:
+                cleaned[version] = GolangDependencyTreeGenerator.clean_version(version)
+            result.append(cleaned[version])
+        return result
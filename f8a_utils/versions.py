@@ -1,13 +1,92 @@
 """Helper functions related to versions."""
 
-import requests
+import functools
+import inspect
+import json
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from f8a_utils import http_client
+from f8a_utils.cache import InMemoryCache, SqliteCache
+from f8a_utils.default_config import VERSION_LOOKUP_MAX_WORKERS, VERSION_CACHE_BACKEND, \
+    VERSION_CACHE_PATH, VERSION_CACHE_SIZE, VERSION_CACHE_TTL
 from f8a_version_comparator.comparable_version import ComparableVersion
 from f8a_utils.golang_utils import GolangUtils
 from f8a_utils.maven_utils import MavenUtils
 
 _logger = logging.getLogger(__name__)
 
+SUPPORTED_ECOSYSTEMS = ('npm', 'pypi', 'maven', 'golang')
+
+_version_cache = None
+_version_cache_configured = False
+_version_cache_lock = threading.Lock()
+
+
+def get_version_cache():
+    """Return cache of version lookups, created from VERSION_CACHE_* config on first use.
+
+    :return: f8a_utils.cache.CacheBackend or None when caching is disabled
+    """
+    global _version_cache, _version_cache_configured
+    if not _version_cache_configured:
+        with _version_cache_lock:
+            if not _version_cache_configured:
+                if VERSION_CACHE_BACKEND == 'memory':
+                    _version_cache = InMemoryCache(VERSION_CACHE_SIZE)
+                elif VERSION_CACHE_BACKEND == 'sqlite':
+                    directory = os.path.dirname(VERSION_CACHE_PATH)
+                    if directory:
+                        os.makedirs(directory, mode=0o700, exist_ok=True)
+                    _version_cache = SqliteCache(VERSION_CACHE_PATH, VERSION_CACHE_SIZE,
+                                                 serializer=json)
+                elif VERSION_CACHE_BACKEND != 'none':
+                    raise ValueError('Unsupported version cache backend: {b}'.format(
+                        b=VERSION_CACHE_BACKEND))
+                _version_cache_configured = True
+    return _version_cache
+
+
+def set_version_cache(cache):
+    """Replace cache of version lookups.
+
+    :param cache: f8a_utils.cache.CacheBackend, None disables caching
+    """
+    global _version_cache, _version_cache_configured
+    with _version_cache_lock:
+        _version_cache = cache
+        _version_cache_configured = True
+
+
+def _cached_versions(ecosystem):
+    """Cache results of a version lookup function for the TTL of the ecosystem.
+
+    Empty results, e.g. of unknown packages or failed requests, are not cached.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_version_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            key = ('versions', ecosystem) + tuple(arguments.arguments.items())
+            cached = cache.get(key)
+            if cached is not None:
+                return json.loads(cached)
+            value = func(*args, **kwargs)
+            if value and (not isinstance(value, dict) or value.get('versions')):
+                # Serialized, so that callers never share mutable lists with the cache.
+                cache.set(key, json.dumps(value),
+                          ttl=VERSION_CACHE_TTL.get(ecosystem))
+            return value
+        return wrapper
+    return decorator
+
 
 def get_versions_and_latest_for_ep(ecosystem, package_name, multi_source=False):
     """Get all versions for given (ecosystem, package).
@@ -57,6 +136,64 @@ def get_versions_for_ep(ecosystem, package_name, multi_source=False):
         raise ValueError('Unsupported ecosystem: {e}'.format(e=ecosystem))
 
 
+def get_versions_for_ep_bulk(ecosystem, package_names, multi_source=False,
+                             max_workers=VERSION_LOOKUP_MAX_WORKERS, deadline=None):
+    """Get all versions and the latest version for many packages of an ecosystem concurrently.
+
+    Every distinct package is looked up once, failures of single packages are reported
+    in their results instead of being raised.
+
+    :param ecosystem: str, ecosystem name
+    :param package_names: iterable of str, package names
+    :param multi_source: bool, fetch data from more than 1 source. applicable for maven
+    :param max_workers: int, maximum number of packages looked up at once
+    :param deadline: int, seconds for all lookups; packages not resolved by then get an error
+    :return dict, {package_name: {'versions': list, 'latest_version': str, 'error': str}},
+            where error is None on success and versions and latest_version are None on failure
+    """
+    if ecosystem not in SUPPORTED_ECOSYSTEMS:
+        raise ValueError('Unsupported ecosystem: {e}'.format(e=ecosystem))
+
+    names = list(dict.fromkeys(package_names))
+    results = {}
+    if not names:
+        return results
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(names)))
+    try:
+        futures = {executor.submit(get_versions_and_latest_for_ep, ecosystem, name,
+                                   multi_source): name for name in names}
+        done, not_done = wait(futures, timeout=deadline)
+        for future in not_done:
+            # Lookups already running are left to finish in the background.
+            future.cancel()
+            results[futures[future]] = _bulk_error(
+                'Deadline of {d} seconds exceeded'.format(d=deadline))
+        for future in done:
+            name = futures[future]
+            try:
+                value = future.result()
+                # Lookups of unknown packages return an empty list even for dual values.
+                if not isinstance(value, dict) or not value.get('versions'):
+                    results[name] = _bulk_error('Package not found')
+                    continue
+                results[name] = {'versions': value['versions'],
+                                 'latest_version': value['latest_version'],
+                                 'error': None}
+            except Exception as e:
+                _logger.error('Unable to fetch versions for package {p}: {e}'.format(
+                    p=name, e=e))
+                results[name] = _bulk_error(str(e) or type(e).__name__)
+    finally:
+        executor.shutdown(wait=False)
+    return {name: results[name] for name in names}
+
+
+def _bulk_error(message):
+    """Return result of a package that could not be looked up."""
+    return {'versions': None, 'latest_version': None, 'error': message}
+
+
 def is_pkg_public(ecosystem, package_name):
     """Check if a pkg is publicly available."""
     version = get_versions_for_ep(ecosystem, package_name)
@@ -90,6 +227,7 @@ def get_latest_versions_for_ep(ecosystem, package_name, multi_source=False):
     return version
 
 
+@_cached_versions('golang')
 def get_versions_for_golang_package(package_name, latest=False, dual_values=False):
     """Get all versions for given golang package.
 
@@ -109,6 +247,7 @@ def get_versions_for_golang_package(package_name, latest=False, dual_values=Fals
     return all_ver
 
 
+@_cached_versions('npm')
 def get_versions_for_npm_package(package_name, latest=False, dual_values=False):
     """Get all versions for given NPM package.
 
@@ -121,7 +260,7 @@ def get_versions_for_npm_package(package_name, latest=False, dual_values=False):
         pkg_name=package_name
     )
 
-    response = requests.get(url)
+    response = http_client.get(url)
 
     if response.status_code != 200:
         _logger.info(
@@ -157,6 +296,7 @@ def get_versions_for_npm_package(package_name, latest=False, dual_values=False):
     return ver_list
 
 
+@_cached_versions('pypi')
 def get_versions_for_pypi_package(package_name, latest=False, dual_values=False):
     """Get all versions for given PyPI package.
 
@@ -169,7 +309,7 @@ def get_versions_for_pypi_package(package_name, latest=False, dual_values=False)
         pkg_name=package_name
     )
 
-    response = requests.get(pypi_package_url)
+    response = http_client.get(pypi_package_url)
     if response.status_code != 200:
         _logger.info(
             'Unable to fetch versions for package {pkg_name}'.format(pkg_name=package_name)
@@ -191,6 +331,7 @@ def get_versions_for_pypi_package(package_name, latest=False, dual_values=False)
     return ver_list
 
 
+@_cached_versions('maven')
 def get_versions_for_maven_package(package_name, latest=False,
                                    dual_values=False, multi_source=False):
     """Get all versions for given package from Maven Central.
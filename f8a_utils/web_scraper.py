@@ -19,7 +19,7 @@
 
 
 from bs4 import BeautifulSoup
-import requests
+from f8a_utils import http_client
 
 
 class Scraper:
@@ -27,7 +27,7 @@ class Scraper:
 
     def __init__(self, url):
         """Init method for Scraper class."""
-        html_content = requests.get(url).text
+        html_content = http_client.get(url).text
         self.DATA = BeautifulSoup(html_content, "lxml")
 
     def get_data(self):
@@ -0,0 +1,103 @@
+"""Test f8a_utils.commands.command.AsyncExternalCommand."""
+import asyncio
+import time
+import pytest
+import subprocess
+
+from f8a_utils.commands import AsyncExternalCommand
+
+
+@pytest.fixture
+def loop():
+    """Event loop with the child watcher attached."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+    asyncio.set_event_loop(None)
+
+
+def test_success(loop):
+    """Test success."""
+    cmd = AsyncExternalCommand(['bash', '-c', 'echo -n out; echo -n err >&2'])
+    assert loop.run_until_complete(cmd.run()) is True
+    assert (cmd.rc, cmd.stdout, cmd.stderr) == (0, 'out', 'err')
+
+
+def test_failure(loop):
+    """Test failure, with and without raise_on_error."""
+    cmd = AsyncExternalCommand(['bash', '-c', 'exit 3'])
+    assert loop.run_until_complete(cmd.run()) is False
+    assert cmd.rc == 3
+    with pytest.raises(subprocess.CalledProcessError):
+        loop.run_until_complete(cmd.run(raise_on_error=True))
+
+
+def test_update_env(loop):
+    """Test updating environment and working directory."""
+    cmd = AsyncExternalCommand(['bash', '-c', 'echo -n "${NAME} in $PWD"'])
+    assert loop.run_until_complete(cmd.run(update_env={'NAME': 'Jon Snow'}, cwd='/')) is True
+    assert cmd.stdout == 'Jon Snow in /'
+
+
+def test_timeout_kill_children(loop):
+    """Test that the whole process group is killed on timeout, keeping earlier output."""
+    cmd = AsyncExternalCommand(['bash', '-c', 'echo -n started; bash -c "sleep 10" & wait'])
+    start = time.time()
+    assert loop.run_until_complete(cmd.run(timeout=1)) is False
+    # The grandchild holds stdout open, output is complete only once it is killed too.
+    assert time.time() - start < 5
+    assert cmd.expired is True
+    assert cmd.rc == 1
+    assert cmd.stdout == 'started'
+
+
+def test_timeout_main_process_exited(loop):
+    """Test that children keeping the pipes open are killed when the main process exited."""
+    cmd = AsyncExternalCommand(['sh', '-c', 'sleep 6 & echo hi'])
+    start = time.time()
+    assert loop.run_until_complete(cmd.run(timeout=1)) is False
+    assert time.time() - start < 3
+    assert cmd.expired is True
+    assert cmd.stdout == 'hi\n'
+
+
+def test_rerun_after_timeout(loop):
+    """Test that a run after a timed out one reports its own outcome."""
+    cmd = AsyncExternalCommand(['sh', '-c', 'sleep "$DELAY"; echo -n done'])
+    assert loop.run_until_complete(cmd.run(timeout=1, update_env={'DELAY': '3'})) is False
+    assert (cmd.rc, cmd.expired) == (1, True)
+    assert loop.run_until_complete(cmd.run(update_env={'DELAY': '0'})) is True
+    assert (cmd.rc, cmd.expired, cmd.stdout) == (0, False, 'done')
+
+
+def test_concurrent_runs(loop):
+    """Test that many commands are supervised from a single loop."""
+    commands = [AsyncExternalCommand(['bash', '-c', 'sleep 1; echo -n {}'.format(i)])
+                for i in range(20)]
+    start = time.time()
+    results = loop.run_until_complete(asyncio.gather(*[cmd.run() for cmd in commands]))
+    assert time.time() - start < 5
+    assert results == [True] * 20
+    assert [cmd.stdout for cmd in commands] == [str(i) for i in range(20)]
+
+
+def test_cancel(loop):
+    """Test that cancelling the run kills the command."""
+    cmd = AsyncExternalCommand(['bash', '-c', 'echo $$; sleep 10'])
+
+    async def cancel():
+        task = asyncio.ensure_future(cmd.run())
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    loop.run_until_complete(cancel())
+    assert cmd.rc is None
+
+
+def test_magic_str():
+    """Test str(AsyncExternalCommand)."""
+    assert str(AsyncExternalCommand(['java', '-version'])) == \
+        'AsyncExternalCommand: java -version'
@@ -3,6 +3,9 @@ import os
 import time
 import pytest
 import subprocess
+import sys
+import threading
+from unittest.mock import patch
 
 from f8a_utils.commands import ExternalCommand
 
@@ -47,6 +50,34 @@ def test_timeout_raise():
         ExternalCommand(['bash', '-c', 'sleep 10']).run(timeout=1, raise_on_error=True)
 
 
+def test_rerun_after_timeout():
+    """Test that a run after a timed out one reports its own outcome."""
+    cmd = ExternalCommand(['sh', '-c', 'sleep "$DELAY"; echo -n done'])
+    assert cmd.run(timeout=1, update_env={'DELAY': '3'}) is False
+    assert (cmd.rc, cmd.expired) == (1, True)
+    assert cmd.run(update_env={'DELAY': '0'}) is True
+    assert (cmd.rc, cmd.expired, cmd.stdout) == (0, False, 'done')
+    assert cmd.run(timeout=1, update_env={'DELAY': '3'}, consumer=list) is False
+    assert cmd.run(update_env={'DELAY': '0'}, consumer=list) is True
+    assert (cmd.rc, cmd.expired, cmd.result) == (0, False, ['done'])
+
+
+def test_timer_after_reap():
+    """Test that a timer firing after the process was reaped neither kills nor expires."""
+    cmd = ExternalCommand(['true'])
+    proc = cmd._start()
+    guard = threading.Lock()
+    proc.stdout.read()
+    cmd._wait(proc, guard)
+    assert proc.returncode == 0
+    with patch('os.killpg') as killpg:
+        cmd._expire(proc, guard)
+    assert not killpg.called
+    assert cmd.expired is False
+    proc.stdout.close()
+    proc.stderr.close()
+
+
 def test_update_env():
     """Test updating environment."""
     cmd = ExternalCommand(['bash', '-c', 'echo -n "You know nothing, ${NAME}..."'])
@@ -78,6 +109,170 @@ def test_kill_children():
         assert False
 
 
+def test_consumer():
+    """Test that stdout is passed to the consumer while the command runs."""
+    cmd = ExternalCommand(['bash', '-c', 'echo first; echo oops >&2; echo second'])
+    assert cmd.run(consumer=lambda lines: [line.strip() for line in lines]) is True
+    assert cmd.result == ['first', 'second']
+    assert cmd.stdout is None
+    assert cmd.stderr == 'oops\n'
+
+    # Output the consumer does not read is discarded.
+    cmd = ExternalCommand(['bash', '-c', 'seq 100000'])
+    assert cmd.run(consumer=next) is True
+    assert cmd.result == '1\n'
+
+
+def test_consumer_failure():
+    """Test that consumer result is dropped when the command fails or times out."""
+    cmd = ExternalCommand(['bash', '-c', 'echo partial; exit 3'])
+    assert cmd.run(consumer=list) is False
+    assert cmd.rc == 3
+    assert cmd.result is None
+
+    cmd = ExternalCommand(['bash', '-c', 'echo partial; sleep 10'])
+    start = time.time()
+    assert cmd.run(timeout=1, consumer=list) is False
+    assert time.time() - start < 5
+    assert cmd.expired is True
+    assert cmd.result is None
+
+
+def test_consumer_failure_raise():
+    """Test that command failures take precedence over errors of the consumer."""
+    def consumer(lines):
+        if not list(lines):
+            raise ValueError('Empty output')
+        return 'parsed'
+
+    cmd = ExternalCommand(['bash', '-c', 'echo partial; sleep 10'])
+    with pytest.raises(subprocess.CalledProcessError):
+        cmd.run(timeout=1, raise_on_error=True, consumer=consumer)
+    assert cmd.expired is True
+    assert cmd.result is None
+
+    cmd = ExternalCommand(['bash', '-c', 'exit 3'])
+    assert cmd.run(consumer=consumer) is False
+    assert cmd.rc == 3
+    with pytest.raises(subprocess.CalledProcessError):
+        cmd.run(raise_on_error=True, consumer=consumer)
+
+    # The consumer's own error is raised when the command succeeded.
+    cmd = ExternalCommand(['bash', '-c', 'true'])
+    with pytest.raises(ValueError):
+        cmd.run(consumer=consumer)
+
+
+def test_consumer_exception():
+    """Test that the command is killed when the consumer fails."""
+    def consumer(lines):
+        next(lines)
+        raise ValueError('Invalid output')
+
+    cmd = ExternalCommand(['bash', '-c', 'echo invalid; sleep 10'])
+    start = time.time()
+    with pytest.raises(ValueError):
+        cmd.run(consumer=consumer)
+    assert time.time() - start < 5
+
+
+def test_iter_output():
+    """Test that output is yielded while the command runs, keeping only tails of it."""
+    stderr = []
+    cmd = ExternalCommand(['bash', '-c', 'seq 5; seq 3 >&2'])
+    lines = cmd.iter_output(stdout_tail=2, stderr_tail=1, stderr_callback=stderr.append)
+    assert next(lines) == '1\n'
+    assert cmd.rc is None
+    assert list(lines) == ['2\n', '3\n', '4\n', '5\n']
+    assert cmd.rc == 0
+    assert cmd.stdout == '4\n5\n'
+    assert cmd.stderr == '3\n'
+    assert stderr == ['1\n', '2\n', '3\n']
+
+    chunks = []
+    cmd = ExternalCommand(['bash', '-c', 'echo -n abcdefg'])
+    assert list(cmd.iter_output(chunk_size=3, stdout_callback=chunks.append)) == [
+        'abc', 'def', 'g']
+    assert chunks == ['abc', 'def', 'g']
+
+
+def test_iter_output_chunks_while_running():
+    """Test that chunks are yielded as soon as the command writes them."""
+    cmd = ExternalCommand(['bash', '-c', 'echo -n a; sleep 2; printf "b\\r\\n\\xc5\\xbe"'])
+    start = time.time()
+    chunks = cmd.iter_output(chunk_size=1024)
+    assert next(chunks) == 'a'
+    assert time.time() - start < 1.5
+    assert ''.join(chunks) == 'b\n\u017e'
+    assert cmd.rc == 0
+
+
+def test_iter_output_failure():
+    """Test that failures are reported at the end of the output."""
+    cmd = ExternalCommand(['bash', '-c', 'echo out; echo err >&2; exit 2'])
+    assert list(cmd.iter_output()) == ['out\n']
+    assert cmd.rc == 2
+    assert cmd.stderr == 'err\n'
+
+    cmd = ExternalCommand(['bash', '-c', 'echo out; sleep 10'])
+    with pytest.raises(subprocess.CalledProcessError):
+        list(cmd.iter_output(timeout=1, raise_on_error=True))
+    assert cmd.expired is True
+
+
+def test_iter_output_close():
+    """Test that closing the output early kills the command."""
+    cmd = ExternalCommand(['bash', '-c', 'echo $$; sleep 10'])
+    lines = cmd.iter_output()
+    pid = int(next(lines))
+    lines.close()
+    assert cmd.rc == -9
+    with pytest.raises(OSError):
+        os.kill(pid, 0)
+
+
+def test_resource_usage():
+    """Test that resource usage of the command is recorded and logged."""
+    cmd = ExternalCommand([sys.executable, '-c', 'b = bytearray(64 << 20); sum(range(10 ** 6))'])
+    assert cmd.run() is True
+    assert cmd.cpu_user > 0
+    assert cmd.cpu_system >= 0
+    assert cmd.max_rss > 64 << 10
+    assert cmd.read_blocks >= 0 and cmd.write_blocks >= 0
+    assert 'user {:.2f}s'.format(cmd.cpu_user) in cmd._resources()
+
+    cmd = ExternalCommand(['bash', '-c', 'sleep 10'])
+    assert list(cmd.iter_output(timeout=1)) == []
+    assert cmd.expired is True
+    assert cmd.max_rss > 0
+
+
+@pytest.mark.skipif(not hasattr(os, 'wait4'), reason='os.wait4() not available')
+def test_resource_usage_all_modes():
+    """Test that resource usage and exit status are recorded in every mode of running."""
+    args = [sys.executable, '-c', 'sum(range(10 ** 6)); print("x"); raise SystemExit(3)']
+
+    cmd = ExternalCommand(args)
+    assert cmd.run() is False
+    assert cmd.rc == 3 and cmd.stdout == 'x\n'
+    assert cmd.cpu_user > 0 and cmd.max_rss > 0
+
+    cmd = ExternalCommand(args)
+    assert list(cmd.iter_output()) == ['x\n']
+    assert cmd.rc == 3
+    assert cmd.cpu_user > 0 and cmd.max_rss > 0
+
+    cmd = ExternalCommand(args)
+    assert cmd.run(consumer=list) is False
+    assert cmd.rc == 3
+    assert cmd.cpu_user > 0 and cmd.max_rss > 0
+
+    cmd = ExternalCommand(['bash', '-c', 'kill -9 $$'])
+    assert cmd.run() is False
+    assert cmd.rc == -9
+    assert cmd.max_rss > 0
+
+
 def test_magic_str():
     """Test str(ExternalCommand)."""
     assert str(ExternalCommand(['java', '-version'])) == 'ExternalCommand: java -version'
@@ -0,0 +1,56 @@
+"""Test f8a_utils.commands.runner module."""
+import subprocess
+import time
+import pytest
+
+from f8a_utils.commands import ExternalCommand, CommandRunner, run_commands
+
+
+def test_run_commands():
+    """Test that commands run concurrently and results are kept in order."""
+    commands = [ExternalCommand(['bash', '-c', 'sleep 1; exit {}'.format(rc)])
+                for rc in range(4)]
+    start = time.time()
+    results = run_commands(commands, max_workers=4)
+    assert time.time() - start < 3
+    assert [result.command for result in results] == commands
+    assert [result.rc for result in results] == [0, 1, 2, 3]
+    assert all(result.duration > 0.5 for result in results)
+    assert not any(result.expired or result.error for result in results)
+
+
+def test_run_commands_timeouts():
+    """Test per command timeouts, overriding the default one."""
+    results = run_commands([
+        ExternalCommand(['bash', '-c', 'sleep 10']),
+        (ExternalCommand(['bash', '-c', 'sleep 1']), {'timeout': 5}),
+    ], timeout=1)
+    assert [result.expired for result in results] == [True, False]
+    assert [result.rc for result in results] == [1, 0]
+
+
+def test_run_commands_deadline():
+    """Test that the deadline kills running commands and skips the others."""
+    with CommandRunner(max_workers=1) as runner:
+        start = time.time()
+        results = runner.run([ExternalCommand(['bash', '-c', 'sleep 10']),
+                              ExternalCommand(['bash', '-c', 'true'])], deadline=1)
+        assert time.time() - start < 5
+    assert [result.expired for result in results] == [True, True]
+    assert [result.rc for result in results] == [1, None]
+
+
+def test_run_commands_errors():
+    """Test that exceptions of commands are collected."""
+    results = run_commands([ExternalCommand(['bash', '-c', 'false']),
+                            ExternalCommand(['/nonexistent/command'])],
+                           raise_on_error=True)
+    assert isinstance(results[0].error, subprocess.CalledProcessError)
+    assert isinstance(results[1].error, OSError)
+    assert results[1].rc is None
+
+
+def test_runner_input_validation():
+    """Test input validation."""
+    with pytest.raises(ValueError):
+        CommandRunner(max_workers=0)
@@ -0,0 +1,129 @@
+"""Tests for classes from cache module."""
+import json
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from f8a_utils.cache import InMemoryCache, DiskCache, SqliteCache
+
+
+def test_in_memory_cache_lru_eviction():
+    """Test that the least recently used entry is evicted."""
+    cache = InMemoryCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'size': 2}
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_cache_input_validation():
+    """Test input validation."""
+    with pytest.raises(ValueError):
+        InMemoryCache(max_size=0)
+    with pytest.raises(ValueError):
+        InMemoryCache().set('a', None)
+
+
+def test_disk_cache(tmpdir):
+    """Test that the on-disk cache persists and evicts entries."""
+    cache = DiskCache(str(tmpdir), max_size=2)
+    cache.set(('maven', True, 'abc'), {'deps': [1, 2]})
+    cache.set('b', b'2')
+    assert cache.get(('maven', True, 'abc')) == {'deps': [1, 2]}
+    cache.set('b', b'3')
+    assert len(cache) == 2
+
+    cache = DiskCache(str(tmpdir), max_size=2)
+    assert cache.get('b') == b'3'
+    assert cache.get('missing', 'default') == 'default'
+    cache.set('c', b'4')
+    assert len(cache) == 2
+    assert cache.get(('maven', True, 'abc')) is None
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'size': 2}
+    cache.clear()
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize('backend', ['memory', 'disk', 'sqlite'])
+def test_cache_ttl(tmpdir, backend):
+    """Test that entries expire after the cache or entry TTL."""
+    cache = {
+        'memory': lambda: InMemoryCache(ttl=10),
+        'disk': lambda: DiskCache(str(tmpdir), ttl=10),
+        'sqlite': lambda: SqliteCache(str(tmpdir.join('cache.sqlite')), ttl=10),
+    }[backend]()
+    cache.set('default', ['a'])
+    cache.set('short', ['b'], ttl=5)
+    cache.set('long', ['c'], ttl=100)
+    assert cache.get('short') == ['b']
+    now = time.time()
+    with patch.object(time, 'time', return_value=now + 7):
+        assert cache.get('short') is None
+        assert cache.get('default') == ['a']
+    with patch.object(time, 'time', return_value=now + 50):
+        assert cache.get('default') is None
+        assert cache.get('long') == ['c']
+    assert cache.stats()['hits'] == 3
+    assert cache.stats()['misses'] == 2
+
+
+def test_sqlite_cache(tmpdir):
+    """Test that the sqlite cache persists, evicts entries and survives forks."""
+    path = str(tmpdir.join('cache.sqlite'))
+    cache = SqliteCache(path, max_size=2)
+    cache.set(('npm', 'lodash'), {'versions': ['4.17.21']})
+    cache.set('b', b'2')
+    assert cache.get(('npm', 'lodash')) == {'versions': ['4.17.21']}
+    time.sleep(0.01)
+    cache.set('c', b'3')
+    assert len(cache) == 2
+    assert cache.get('b') is None
+
+    cache = SqliteCache(path, max_size=2)
+    assert cache.get(('npm', 'lodash')) == {'versions': ['4.17.21']}
+    with patch.object(os, 'getpid', return_value=os.getpid() + 1):
+        assert cache.get('c') == b'3'
+    cache.clear()
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize('backend', ['disk', 'sqlite'])
+def test_json_serializer(tmpdir, backend):
+    """Test that on-disk caches store JSON, never unpickling what they read."""
+    cache = {
+        'disk': lambda: DiskCache(str(tmpdir), serializer=json),
+        'sqlite': lambda: SqliteCache(str(tmpdir.join('cache.sqlite')), serializer=json),
+    }[backend]()
+    cache.set(('npm', 'lodash'), {'versions': ['4.17.21'], 'latest_version': '4.17.21'})
+    assert cache.get(('npm', 'lodash')) == {'versions': ['4.17.21'],
+                                            'latest_version': '4.17.21'}
+    with patch('pickle.loads') as loads, patch('pickle.load') as load:
+        assert cache.get(('npm', 'lodash'))['versions'] == ['4.17.21']
+    assert not loads.called and not load.called
+
+
+def test_stats_concurrent():
+    """Test that hits and misses counted from many threads are not lost."""
+    cache = InMemoryCache()
+    cache.set('a', 1)
+
+    def lookup():
+        for _ in range(2000):
+            cache.get('a')
+            cache.get('b')
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats() == {'hits': 16000, 'misses': 16000, 'size': 1}
@@ -1,12 +1,22 @@
 """Tests for classes from depencency_finder module."""
+import asyncio
+import copy
 import json
+import pickle
+import subprocess
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
+from f8a_utils.cache import InMemoryCache, DiskCache
 from f8a_utils.dependency_finder import DependencyFinder
 from pathlib import Path
 import pytest
 
-from f8a_utils.tree_generator import GolangDependencyTreeGenerator, MavenDependencyTreeGenerator
+from f8a_utils.dependency_graph import TransitiveResolver
+from f8a_utils.dependency_nodes import DependencyNode, GolangDependencyNode, node_to_dict
+from f8a_utils.tree_generator import GolangDependencyTreeGenerator, MavenDependencyTreeGenerator, \
+    NpmDependencyTreeGenerator
 
 
 def test_scan_and_find_dependencies_npm():
@@ -35,6 +45,63 @@ def test_scan_and_find_dependencies_npm_npm_list_as_bytes():
     assert len(res['result'][0]['details'][0]['_resolved'][0]['deps']) == 0
 
 
+def test_scan_and_find_dependencies_npm_dedup():
+    """Test that npm transitives are reported once per direct dependency."""
+    leaf = {"version": "2.0.0"}
+    content = {"dependencies": {"app": {"version": "1.0.0", "dependencies": {
+        "debug": {"version": "2.6.9", "dependencies": {"ms": leaf}},
+        "ms": leaf,
+        "send": {"version": "0.16.2", "dependencies": {"debug": {
+            "version": "2.6.9", "dependencies": {"ms": leaf}}}},
+    }}}}
+    manifests = [{"filename": "npmlist.json", "filepath": "/bin/local",
+                  "content": json.dumps(content)}]
+    res = DependencyFinder().scan_and_find_dependencies("npm", manifests, True)
+    assert res['result'][0]['details'][0]['_resolved'][0]['deps'] == [
+        {"package": "debug", "version": "2.6.9"},
+        {"package": "ms", "version": "2.0.0"},
+        {"package": "send", "version": "0.16.2"}]
+
+
+def test_scan_and_find_dependencies_npm_lockfile():
+    """Test scan_and_find_dependencies function for NPM package-lock.json v3."""
+    manifests = [{
+        "filename": "package-lock.json",
+        "filepath": "/bin/local",
+        "content": open(str(Path(__file__).parent / "data/package-lock.json"), "rb").read()
+    }]
+    res = DependencyFinder().scan_and_find_dependencies("npm", manifests, True)
+    resolved = res['result'][0]['details'][0]['_resolved']
+    assert resolved == [
+        {"package": "@booster/utils", "version": "0.1.0", "deps": [
+            {"package": "ms", "version": "2.0.0"}]},
+        {"package": "body-parser", "version": "1.18.2", "deps": [
+            {"package": "debug", "version": "2.6.9"},
+            {"package": "ms", "version": "2.0.0"},
+            {"package": "qs", "version": "6.5.1"}]},
+        {"package": "express", "version": "4.16.4", "deps": [
+            {"package": "body-parser", "version": "1.18.3"},
+            {"package": "debug", "version": "2.6.9"},
+            {"package": "ms", "version": "2.0.0"},
+            {"package": "qs", "version": "6.5.2"}]},
+    ]
+
+    res = DependencyFinder().scan_and_find_dependencies("npm", manifests, False)
+    resolved = res['result'][0]['details'][0]['_resolved']
+    assert [r['deps'] for r in resolved] == [[], [], []]
+
+
+def test_npm_parse_transitives_deep_nesting():
+    """Test that deeply nested npm output does not hit the recursion limit."""
+    nested = {"ms": {"version": "2.0.0"}}
+    for i in range(5000):
+        nested = {"pkg-{}".format(i): {"version": "1.0.0", "dependencies": nested}}
+    transitive = NpmDependencyTreeGenerator()._parse_transitives([], nested)
+    assert len(transitive) == 5001
+    assert transitive[0] == {"package": "pkg-4999", "version": "1.0.0"}
+    assert transitive[-1] == {"package": "ms", "version": "2.0.0"}
+
+
 def test_scan_and_find_dependencies_pypi():
     """Test scan_and_find_dependencies function for PyPi."""
     manifests = [{
@@ -60,6 +127,41 @@ def test_scan_and_find_dependencies_golang():
     res = DependencyFinder().scan_and_find_dependencies("golang", manifests, True)
     assert res == dep_tree
 
+    with open(str(Path(__file__).parent / "data/gograph.txt")) as fd:
+        manifests[0]["content"] = fd
+        assert DependencyFinder().scan_and_find_dependencies("golang", manifests, True) == dep_tree
+    manifests[0]["content"] = iter(['\n'])
+    with pytest.raises(ValueError):
+        DependencyFinder().scan_and_find_dependencies("golang", manifests, True)
+
+
+def test_scan_and_find_dependencies_from_command():
+    """Test that command output is parsed while the command runs."""
+    data = Path(__file__).parent / "data"
+    with open(str(data / "golang_dep_tree.json")) as fp:
+        dep_tree = json.load(fp)
+    res = DependencyFinder().scan_and_find_dependencies_from_command(
+        "golang", ['cat', str(data / "gograph.txt")], True, "gograph.txt", "/bin/local")
+    assert res == dep_tree
+
+    for ecosystem, filename in (("maven", "dependencies.txt"), ("npm", "npmlist.json"),
+                                ("pypi", "pylist.json")):
+        manifests = [{"filename": filename, "filepath": "/bin/local",
+                      "content": open(str(data / filename)).read()}]
+        res = DependencyFinder().scan_and_find_dependencies_from_command(
+            ecosystem, ['cat', str(data / filename)], "true", filename, "/bin/local",
+            timeout=30)
+        assert res == DependencyFinder().scan_and_find_dependencies(ecosystem, manifests, True)
+
+    with pytest.raises(subprocess.CalledProcessError):
+        DependencyFinder().scan_and_find_dependencies_from_command(
+            "golang", ['bash', '-c', 'cat "$0"; exit 1', str(data / "gograph.txt")], True,
+            "gograph.txt", "/bin/local")
+    with pytest.raises(subprocess.CalledProcessError):
+        DependencyFinder().scan_and_find_dependencies_from_command(
+            "golang", ['sh', '-c', 'echo "a b@v1.0.0"; sleep 5'], True,
+            "gograph.txt", "/bin/local", timeout=1, output_format="graph")
+
 
 class TestDependencyFinder(unittest.TestCase):
     """Test class."""
@@ -114,6 +216,18 @@ class TestDependencyFinder(unittest.TestCase):
         self.assertEqual(res['groupId'], 'io.vertx')
         self.assertEqual(res['version'], '3.5.4.redhat-00002')
 
+    def test_parse_coordinates_cached(self):
+        """Test that Maven coordinates are parsed once per distinct string."""
+        coordinates_str = "io.vertx:vertx-web:jar:3.5.4.redhat-00002:compile"
+        res = MavenDependencyTreeGenerator._parse_coordinates(coordinates_str)
+        self.assertIs(res, MavenDependencyTreeGenerator._parse_coordinates(coordinates_str))
+        self.assertEqual(res.package, 'io.vertx:vertx-web')
+        self.assertEqual(res.scope, 'compile')
+        self.assertRaises(AttributeError, setattr, res, 'version', '1.0')
+        self.assertEqual(MavenDependencyTreeGenerator()._parse_string(coordinates_str), {
+            'groupId': 'io.vertx', 'artifactId': 'vertx-web', 'packaging': 'jar',
+            'version': '3.5.4.redhat-00002', 'classifier': '', 'scope': 'compile'})
+
 
 def test_clean_version():
     """Test clean version."""
@@ -134,6 +248,17 @@ def test_clean_version():
     assert cleaned_vr == '1.1.1-dev1'
 
 
+def test_clean_versions():
+    """Test bulk clean versions."""
+    versions = ['v2.1.4+incompatible', 'v32$@12', 'v2.1.4+incompatible', 'v0.20.1-beta']
+    assert DependencyFinder().clean_versions(iter(versions)) == [
+        (True, '2.1.4'), (False, '32$@12'), (True, '2.1.4'), (True, '0.20.1-beta')]
+    assert DependencyFinder().clean_versions([]) == []
+    hits = GolangDependencyTreeGenerator.clean_version.cache_info().hits
+    DependencyFinder().clean_version('v2.1.4+incompatible')
+    assert GolangDependencyTreeGenerator.clean_version.cache_info().hits == hits + 1
+
+
 def test_scan_and_find_dependencies_pypi_pylist_as_bytes():
     """Test scan_and_find_dependencies function for PyPi."""
     manifests = [{
@@ -239,6 +364,494 @@ def test_scan_and_find_dependencies_maven_ignore_test_deps():
         assert package['package'] not in test_packages
 
 
+def test_scan_and_find_dependencies_maven_streamed_content():
+    """Test scan_and_find_dependencies function for Maven with streamed content."""
+    path = Path(__file__).parent / "data/dependencies.txt"
+    with open(str(path), "rb") as fd:
+        contents = [path, fd, iter(path.read_text().splitlines(True))]
+        for content in contents:
+            manifests = [{
+                "filename": "dependencies.txt",
+                "filepath": "/bin/local",
+                "content": content
+            }]
+            res = DependencyFinder().scan_and_find_dependencies("maven", manifests, True)
+            resolved = res['result'][0]['details'][0]['_resolved']
+            assert len(resolved) == 4
+            assert resolved[0]['package'] == "io.vertx:vertx-core"
+            assert len(resolved[0]['deps']) == 15
+
+
+def test_scan_and_find_dependencies_parallel():
+    """Test that concurrently resolved manifests match the sequential result."""
+    data = Path(__file__).parent / "data"
+    inputs = {
+        "maven": ["dependencies.txt", "dependencies_various_ncols.txt", "dependencies.txt"],
+        "golang": ["gograph.txt", "gograph_only_direct.txt"],
+    }
+    for ecosystem, filenames in inputs.items():
+        manifests = [{
+            "filename": filename,
+            "filepath": "/bin/local/{}".format(i),
+            "content": (data / filename).read_text()
+        } for i, filename in enumerate(filenames)]
+        expected = DependencyFinder().scan_and_find_dependencies(ecosystem, manifests, True)
+        res = DependencyFinder().scan_and_find_dependencies(
+            ecosystem, manifests, "true", max_workers=2)
+        assert res == expected
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            res = DependencyFinder().scan_and_find_dependencies(
+                ecosystem, manifests, True, executor=executor)
+        assert res == expected
+
+
+def test_scan_and_find_dependencies_async():
+    """Test that manifests are parsed by the executor without blocking the event loop."""
+    manifests = [{
+        "filename": "dependencies.txt",
+        "filepath": "/bin/local",
+        "content": open(str(Path(__file__).parent / "data/dependencies.txt")).read()
+    }, {
+        "filename": "dependencies.txt",
+        "filepath": "/bin/other",
+        "content": open(str(Path(__file__).parent / "data/dependencies.txt")).read()
+    }]
+    expected = DependencyFinder().scan_and_find_dependencies("maven", manifests, "true")
+
+    loop = asyncio.new_event_loop()
+    try:
+        res = loop.run_until_complete(
+            DependencyFinder.scan_and_find_dependencies_async("maven", manifests, "true"))
+        assert res == expected
+
+        cache = InMemoryCache()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for _ in range(2):
+                res = loop.run_until_complete(DependencyFinder.scan_and_find_dependencies_async(
+                    "maven", manifests, True, executor=executor, cache=cache))
+                assert res == expected
+        assert cache.stats() == {'hits': 2, 'misses': 2, 'size': 1}
+    finally:
+        loop.close()
+
+
+def test_scan_and_find_dependencies_async_cache_off_loop():
+    """Test that manifests are hashed and looked up in the cache outside the event loop."""
+    class RecordingCache(InMemoryCache):
+        threads = set()
+
+        def _get(self, key):
+            RecordingCache.threads.add(threading.current_thread())
+            return super()._get(key)
+
+        def _set(self, key, value, expires):
+            RecordingCache.threads.add(threading.current_thread())
+            return super()._set(key, value, expires)
+
+    manifests = [{"filename": "gograph.txt", "filepath": "/bin/local",
+                  "content": "example.com/app golang.org/x/mod@v0.4.0\n"}]
+    cache = RecordingCache()
+    loop = asyncio.new_event_loop()
+    try:
+        for _ in range(2):
+            res = loop.run_until_complete(DependencyFinder.scan_and_find_dependencies_async(
+                "golang", manifests, True, cache=cache))
+            assert res['result'][0]['details'][0]['_resolved'][0]['package'] == \
+                'golang.org/x/mod'
+    finally:
+        loop.close()
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+    assert RecordingCache.threads and threading.main_thread() not in RecordingCache.threads
+
+
+def test_scan_and_find_dependencies_async_cancelled():
+    """Test that cancelled scans do not submit parses waiting for a free slot."""
+    class RecordingExecutor(ThreadPoolExecutor):
+        submitted = 0
+
+        def submit(self, *args, **kwargs):
+            RecordingExecutor.submitted += 1
+            return super().submit(*args, **kwargs)
+
+    manifests = [{"filename": "gograph.txt", "filepath": "/bin/local",
+                  "content": "example.com/app golang.org/x/mod@v0.4.0\n"}]
+
+    async def scan(executor):
+        semaphore = asyncio.Semaphore(1)
+        await semaphore.acquire()
+        task = asyncio.ensure_future(DependencyFinder.scan_and_find_dependencies_async(
+            "golang", manifests, True, executor=executor, semaphore=semaphore))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        semaphore.release()
+        return await DependencyFinder.scan_and_find_dependencies_async(
+            "golang", manifests, True, executor=executor, semaphore=semaphore)
+
+    loop = asyncio.new_event_loop()
+    try:
+        with RecordingExecutor(max_workers=1) as executor:
+            res = loop.run_until_complete(scan(executor))
+    finally:
+        loop.close()
+    assert RecordingExecutor.submitted == 1
+    assert res['result'][0]['details'][0]['_resolved'][0]['package'] == 'golang.org/x/mod'
+
+
+def test_diff_dependencies():
+    """Test diff of direct and transitive dependencies between two manifest revisions."""
+    def dot(edges):
+        return '\n'.join(['digraph "g:root:jar:1.0" {'] + [
+            '"{}" -> "{}" ;'.format(*edge) for edge in edges] + [' } '])
+
+    base = dot([
+        ('g:root:jar:1.0', 'g:a:jar:1.0:compile'),
+        ('g:root:jar:1.0', 'g:b:jar:1.0:compile'),
+        ('g:a:jar:1.0:compile', 'g:x:jar:1.0:compile'),
+        ('g:b:jar:1.0:compile', 'g:y:jar:1.0:compile'),
+    ])
+    head = dot([
+        ('g:root:jar:1.0', 'g:a:jar:1.1:compile'),
+        ('g:root:jar:1.0', 'g:c:jar:1.0:compile'),
+        ('g:a:jar:1.1:compile', 'g:x:jar:1.0:compile'),
+        ('g:c:jar:1.0:compile', 'g:z:jar:2.0:compile'),
+    ])
+    # Unchanged manifests are not parsed at all.
+    unchanged = {"filename": "dependencies.txt", "filepath": "/bin/unchanged",
+                 "content": "invalid"}
+    base_manifests = [
+        {"filename": "dependencies.txt", "filepath": "/bin/local", "content": base}, unchanged]
+    head_manifests = [
+        unchanged, {"filename": "dependencies.txt", "filepath": "/bin/local", "content": head},
+        {"filename": "dependencies.txt", "filepath": "/bin/new", "content": base}]
+
+    cache = InMemoryCache()
+    DependencyFinder().scan_and_find_dependencies("maven", base_manifests[:1], True, cache=cache)
+    res = DependencyFinder().diff_dependencies(
+        "maven", base_manifests, head_manifests, True, cache=cache)
+    # Base revision of /bin/local and the new manifest with the same content.
+    assert cache.stats()['hits'] == 2
+    assert [r['manifest_file_path'] for r in res['result']] == [
+        '/bin/local', '/bin/unchanged', '/bin/new']
+    local, unchanged, new = res['result']
+    assert local['direct'] == {
+        'added': [{'package': 'g:c', 'version': '1.0'}],
+        'removed': [{'package': 'g:b', 'version': '1.0'}],
+        'changed': [{'package': 'g:a', 'base_versions': ['1.0'], 'head_versions': ['1.1']}],
+    }
+    assert local['transitive'] == {
+        'added': [{'package': 'g:z', 'version': '2.0'}],
+        'removed': [{'package': 'g:y', 'version': '1.0'}],
+        'changed': [],
+    }
+    assert unchanged['direct'] == unchanged['transitive'] == {
+        'added': [], 'removed': [], 'changed': []}
+    assert new['direct']['added'] == [
+        {'package': 'g:a', 'version': '1.0'}, {'package': 'g:b', 'version': '1.0'}]
+    assert new['transitive']['removed'] == []
+
+    res_records = DependencyFinder().diff_dependencies(
+        "maven", base_manifests, head_manifests, "true", node_records=True)
+    assert res_records == res
+
+
+def test_scan_and_find_dependencies_compact_output():
+    """Test that the compact output format lists every manifest exactly once."""
+    manifests = [{
+        "filename": "pylist.json",
+        "filepath": "/bin/local/{}".format(i),
+        "content": open(str(Path(__file__).parent / "data/pylist.json")).read()
+    } for i in range(3)]
+    res = DependencyFinder().scan_and_find_dependencies("pypi", manifests, True)
+    assert len(res['result']) == 3
+    assert all(len(r['details']) == 3 for r in res['result'])
+
+    res = DependencyFinder().scan_and_find_dependencies(
+        "pypi", manifests, True, output_format="compact")
+    assert len(res['result']) == 1
+    assert [d['manifest_file_path'] for d in res['result'][0]['details']] == [
+        "/bin/local/0", "/bin/local/1", "/bin/local/2"]
+
+    with pytest.raises(ValueError):
+        DependencyFinder().scan_and_find_dependencies(
+            "pypi", manifests, True, output_format="yaml")
+
+
+def test_scan_and_find_dependencies_graph_output():
+    """Test the graph output format with a node table and edge lists."""
+    manifests = [{
+        "filename": "dependencies.txt",
+        "filepath": "/bin/local/{}".format(i),
+        "content": open(str(Path(__file__).parent / "data/dependencies.txt")).read()
+    } for i in range(2)]
+    tree = DependencyFinder().scan_and_find_dependencies(
+        "maven", manifests, True, output_format="compact")
+    res = DependencyFinder().scan_and_find_dependencies(
+        "maven", manifests, True, output_format="graph")
+    nodes = res['nodes']
+    assert [node['id'] for node in nodes] == list(range(len(nodes)))
+    assert len({(node['package'], node['version']) for node in nodes}) == len(nodes)
+    assert len(res['manifests']) == 2
+    assert res['manifests'][0]['direct'] == res['manifests'][1]['direct']
+
+    for manifest, details in zip(res['manifests'], tree['result'][0]['details']):
+        assert manifest['manifest_file_path'] == details['manifest_file_path']
+        assert [nodes[i]['package'] for i in manifest['direct']] == \
+            [r['package'] for r in details['_resolved']]
+        expected = [(r['package'], d['package'], d['version'])
+                    for r in details['_resolved'] for d in r['deps']]
+        assert [(nodes[a]['package'], nodes[b]['package'], nodes[b]['version'])
+                for a, b in manifest['edges']] == expected
+
+
+def test_scan_and_find_dependencies_cache(tmpdir):
+    """Test that manifests with identical content are served from the cache."""
+    path = Path(__file__).parent / "data/dependencies.txt"
+    manifests = [
+        {"filename": "dependencies.txt", "filepath": "/a", "content": path.read_text()},
+        {"filename": "dependencies.txt", "filepath": "/b", "content": path.read_bytes()},
+        {"filename": "dependencies.txt", "filepath": "/c", "content": path},
+        {"filename": "dependencies.txt", "filepath": "/d", "content": iter([])},
+    ]
+    for cache in (InMemoryCache(), DiskCache(str(tmpdir))):
+        expected = DependencyFinder().scan_and_find_dependencies("maven", manifests[:3], True)
+        res = DependencyFinder().scan_and_find_dependencies(
+            "maven", manifests[:1], True, cache=cache)
+        assert cache.stats() == {'hits': 0, 'misses': 1, 'size': 1}
+        res = DependencyFinder().scan_and_find_dependencies(
+            "maven", manifests, True, cache=cache)
+        assert cache.stats() == {'hits': 3, 'misses': 1, 'size': 1}
+        assert res['result'][-1]['details'][:3] == expected['result'][-1]['details']
+        assert res['result'][-1]['details'][3]['_resolved'] == []
+
+        # Cached trees are not shared with callers.
+        res['result'][0]['details'][0]['_resolved'].clear()
+        DependencyFinder().scan_and_find_dependencies("maven", manifests[:1], False, cache=cache)
+        res = DependencyFinder().scan_and_find_dependencies(
+            "maven", manifests[:1], True, cache=cache)
+        assert res['result'][0]['details'][0] == expected['result'][0]['details'][0]
+        assert cache.stats() == {'hits': 4, 'misses': 2, 'size': 2}
+
+
+def test_scan_and_find_dependencies_node_records():
+    """Test that node records serialize to the same output as dictionaries."""
+    data = Path(__file__).parent / "data"
+    inputs = {
+        "maven": "dependencies.txt",
+        "golang": "gograph.txt",
+        "npm": "package-lock.json",
+        "pypi": "pylist.json",
+    }
+    for ecosystem, filename in inputs.items():
+        manifests = [{"filename": filename, "filepath": "/bin/local",
+                      "content": (data / filename).read_text()}]
+        for output_format in ("legacy", "graph"):
+            expected = DependencyFinder().scan_and_find_dependencies(
+                ecosystem, manifests, True, output_format=output_format)
+            res = DependencyFinder().scan_and_find_dependencies(
+                ecosystem, manifests, True, output_format=output_format, node_records=True)
+            assert json.dumps(res, default=node_to_dict) == json.dumps(expected)
+
+    manifests = [{"filename": "dependencies.txt", "filepath": "/bin/local",
+                  "content": (data / "dependencies.txt").read_text()}]
+    res = DependencyFinder().scan_and_find_dependencies("maven", manifests, True, node_records=True)
+    resolved = res['result'][0]['details'][0]['_resolved']
+    assert resolved[0]['deps'][0] == DependencyNode(
+        'com.fasterxml.jackson.core:jackson-databind', '2.9.6.redhat-00001')
+    assert resolved[0]['deps'][0] is MavenDependencyTreeGenerator(True)._make_node(
+        'com.fasterxml.jackson.core:jackson-databind', '2.9.6.redhat-00001')
+    with pytest.raises(TypeError):
+        node_to_dict(object())
+
+
+def test_dependency_node_immutable():
+    """Test that shared node records cannot be changed, but can be copied and pickled."""
+    node = MavenDependencyTreeGenerator(True)._make_node('g:a', '1.0')
+    with pytest.raises(AttributeError):
+        node.version = '2.0'
+    with pytest.raises(AttributeError):
+        del node.package
+    assert node.to_dict() == {'package': 'g:a', 'version': '1.0'}
+    golang_node = GolangDependencyNode('example.com/app', 'golang.org/x/mod', 'v0.4.0', True,
+                                       '0.4.0')
+    with pytest.raises(AttributeError):
+        golang_node.is_semver = False
+    for record in (node, golang_node):
+        assert pickle.loads(pickle.dumps(record)) == record
+        assert copy.deepcopy(record) == record
+
+
+def test_maven_dependency_tree_cycle_and_diamond():
+    """Test that cyclic and diamond shaped Maven graphs are resolved once per node."""
+    content = '\n'.join([
+        'digraph "g:root:jar:1.0" {',
+        '"g:root:jar:1.0" -> "g:a:jar:1.0:compile" ;',
+        '"g:root:jar:1.0" -> "g:b:jar:1.0:compile" ;',
+        '"g:a:jar:1.0:compile" -> "g:c:jar:1.0:compile" ;',
+        '"g:a:jar:1.0:compile" -> "g:d:jar:1.0:compile" ;',
+        '"g:c:jar:1.0:compile" -> "g:e:jar:1.0:compile" ;',
+        '"g:d:jar:1.0:compile" -> "g:e:jar:1.0:compile" ;',
+        '"g:e:jar:1.0:compile" -> "g:a:jar:1.0:compile" ;',
+        '"g:b:jar:1.0:compile" -> "g:d:jar:1.0:compile" ;',
+        ' } ',
+    ])
+    tree = MavenDependencyTreeGenerator()._get_dependency_tree(content)
+    assert tree['g:a:jar:1.0:compile'] == [
+        'g:d:jar:1.0:compile', 'g:e:jar:1.0:compile', 'g:c:jar:1.0:compile']
+    assert tree['g:b:jar:1.0:compile'] == [
+        'g:d:jar:1.0:compile', 'g:e:jar:1.0:compile', 'g:a:jar:1.0:compile',
+        'g:c:jar:1.0:compile']
+
+
+def test_scan_and_find_dependencies_golang_cyclic_graph():
+    """Test that cyclic go mod graphs terminate and list every node once."""
+    content = '\n'.join([
+        'example.com/app golang.org/x/tools@v0.1.0',
+        'example.com/app golang.org/x/mod@v0.4.0',
+        'example.com/cmd golang.org/x/mod@v0.4.0',
+        'golang.org/x/tools@v0.1.0 golang.org/x/mod@v0.4.0',
+        'golang.org/x/mod@v0.4.0 golang.org/x/tools@v0.1.0',
+        'golang.org/x/mod@v0.4.0 golang.org/x/xerrors@v0.0.0-20200804184101-5ec99f83aff1',
+        ''
+    ])
+    manifests = [{"filename": "gograph.txt", "filepath": "/bin/local", "content": content}]
+    res = DependencyFinder().scan_and_find_dependencies("golang", manifests, True)
+    resolved = res['result'][0]['details'][0]['_resolved']
+    assert [r['package'] for r in resolved] == ['golang.org/x/tools', 'golang.org/x/mod']
+    assert [d['package'] for d in resolved[0]['deps']] == [
+        'golang.org/x/mod', 'golang.org/x/xerrors']
+    assert [d['package'] for d in resolved[1]['deps']] == [
+        'golang.org/x/tools', 'golang.org/x/xerrors']
+
+
+def test_maven_multi_module_dependency_tree():
+    """Test that every digraph block of a reactor build is resolved on its own."""
+    content = '\n'.join([
+        'digraph "g:module-a:jar:1.0" {',
+        '"g:module-a:jar:1.0" -> "g:x:jar:1.0:compile" ;',
+        '"g:x:jar:1.0:compile" -> "g:y:jar:1.0:compile" ;',
+        ' } ',
+        'digraph "g:module-b:jar:1.0" {',
+        '"g:module-b:jar:1.0" -> "g:w:jar:1.0:compile" ;',
+        '"g:module-b:jar:1.0" -> "g:x:jar:1.0:compile" ;',
+        '"g:w:jar:1.0:compile" -> "g:x:jar:1.0:compile" ;',
+        '"g:x:jar:1.0:compile" -> "g:z:jar:1.0:compile" ;',
+        ' } ',
+    ])
+    assert MavenDependencyTreeGenerator()._get_dependency_tree(content) == {
+        'g:x:jar:1.0:compile': ['g:y:jar:1.0:compile', 'g:z:jar:1.0:compile'],
+        'g:w:jar:1.0:compile': ['g:x:jar:1.0:compile', 'g:z:jar:1.0:compile'],
+    }
+
+    manifest = {"filename": "dependencies.txt", "filepath": "/bin/local", "content": content}
+    expected = MavenDependencyTreeGenerator(per_module=True).get_manifest_details(manifest, True)
+    assert [m['module'] for m in expected['_modules']] == [
+        'g:module-a:jar:1.0', 'g:module-b:jar:1.0']
+    assert expected['_modules'][0]['_resolved'] == [
+        {'package': 'g:x', 'version': '1.0', 'deps': [{'package': 'g:y', 'version': '1.0'}]}]
+    assert [r['package'] for r in expected['_modules'][1]['_resolved']] == ['g:w', 'g:x']
+    assert [r['package'] for r in expected['_resolved']] == ['g:x', 'g:w']
+
+    for executor in (ThreadPoolExecutor(max_workers=2), ProcessPoolExecutor(max_workers=2)):
+        with executor:
+            generator = MavenDependencyTreeGenerator(per_module=True, executor=executor)
+            assert generator.get_manifest_details(manifest, True) == expected
+
+    cache = InMemoryCache()
+    for _ in range(2):
+        res = DependencyFinder().scan_and_find_dependencies(
+            "maven", [manifest], True, output_format="compact", cache=cache,
+            generator_options={"per_module": True})
+        assert res['result'][0]['details'] == [expected]
+    assert cache.stats()['hits'] == 1
+
+
+def test_maven_scopes_and_max_depth():
+    """Test that scope filtering and depth limit are applied while the graph is read."""
+    content = '\n'.join([
+        'digraph "g:root:jar:1.0" {',
+        '"g:root:jar:1.0" -> "g:a:jar:1.0:compile" ;',
+        '"g:root:jar:1.0" -> "g:t:jar:1.0:test" ;',
+        '"g:root:jar:1.0" -> "g:p:jar:1.0:provided" ;',
+        '"g:a:jar:1.0:compile" -> "g:b:jar:1.0:compile" ;',
+        '"g:a:jar:1.0:compile" -> "g:r:jar:1.0:runtime" ;',
+        '"g:b:jar:1.0:compile" -> "g:c:jar:1.0:compile" ;',
+        '"g:c:jar:1.0:compile" -> "g:d:jar:1.0:compile" ;',
+        '"g:r:jar:1.0:runtime" -> "g:c:jar:1.0:compile" ;',
+        '"g:t:jar:1.0:test" -> "g:u:jar:1.0:test" ;',
+        ' } ',
+    ])
+    tree = MavenDependencyTreeGenerator(scopes={'compile', 'runtime'})._get_dependency_tree(
+        content)
+    assert tree == {'g:a:jar:1.0:compile': [
+        'g:r:jar:1.0:runtime', 'g:c:jar:1.0:compile', 'g:d:jar:1.0:compile',
+        'g:b:jar:1.0:compile']}
+
+    tree = MavenDependencyTreeGenerator(scopes=['compile'])._get_dependency_tree(content)
+    assert tree == {'g:a:jar:1.0:compile': [
+        'g:b:jar:1.0:compile', 'g:c:jar:1.0:compile', 'g:d:jar:1.0:compile']}
+
+    # Explicitly included test dependencies are reported.
+    manifest = {"filename": "dependencies.txt", "filepath": "/bin/local", "content": content}
+    details = MavenDependencyTreeGenerator(scopes=['test']).get_manifest_details(manifest, True)
+    assert details['_resolved'] == [
+        {'package': 'g:t', 'version': '1.0', 'deps': [{'package': 'g:u', 'version': '1.0'}]}]
+
+    # g:c is first reached three edges below g:a, then over the shorter path through g:r.
+    tree = MavenDependencyTreeGenerator(max_depth=2)._get_dependency_tree(content)
+    assert tree['g:a:jar:1.0:compile'] == [
+        'g:r:jar:1.0:runtime', 'g:c:jar:1.0:compile', 'g:b:jar:1.0:compile']
+    tree = MavenDependencyTreeGenerator(max_depth=3)._get_dependency_tree(content)
+    assert sorted(tree['g:a:jar:1.0:compile']) == sorted(
+        MavenDependencyTreeGenerator()._get_dependency_tree(content)['g:a:jar:1.0:compile'])
+    tree = MavenDependencyTreeGenerator(max_depth=0)._get_dependency_tree(content)
+    assert tree['g:a:jar:1.0:compile'] == []
+
+    cache = InMemoryCache()
+    for max_depth in (1, 1, 2):
+        res = DependencyFinder().scan_and_find_dependencies(
+            "maven", [manifest], True, output_format="compact", cache=cache,
+            generator_options={"scopes": {'runtime', 'compile'}, "max_depth": max_depth})
+        resolved = res['result'][0]['details'][0]['_resolved']
+        assert [d['package'] for d in resolved[0]['deps']] == (
+            ['g:r', 'g:b'] if max_depth == 1 else ['g:r', 'g:c', 'g:b'])
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'size': 2}
+
+
+def test_transitive_resolver_reuses_closures():
+    """Test that reused closures give the same result as a plain depth-first walk."""
+    graph = {
+        'r1': ['x', 'y'],
+        'r2': ['y', 'r1', 'z'],
+        'x': ['y', 'w'],
+        'y': ['w'],
+        'z': ['r2'],
+        'w': [],
+    }
+
+    def walk(root):
+        order, visited = [], {root}
+
+        def visit(node):
+            for child in graph.get(node, []):
+                if child not in visited:
+                    visited.add(child)
+                    order.append(child)
+                    visit(child)
+        visit(root)
+        return order
+
+    resolver = TransitiveResolver(graph)
+    for root in ('r1', 'r2', 'z', 'x', 'r1'):
+        assert resolver.closure(root) == walk(root)
+
+    resolver = TransitiveResolver(graph, max_depth=1)
+    assert resolver.closure('r2') == ['y', 'r1', 'z']
+    resolver = TransitiveResolver(graph, max_depth=2)
+    assert resolver.closure('r2') == ['y', 'w', 'r1', 'x', 'z']
+
+
 if __name__ == '__main__':
     test_scan_and_find_dependencies_npm()
     test_scan_and_find_dependencies_npm_npm_list_as_bytes()
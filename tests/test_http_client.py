@@ -0,0 +1,48 @@
+"""Tests for the shared HTTP session."""
+import os
+from unittest.mock import patch
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from f8a_utils import http_client
+from f8a_utils.default_config import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+
+def _response(_adapter, request, **_kwargs):
+    response = requests.Response()
+    response.status_code = 200
+    response.request = request
+    response.url = request.url
+    response._content = b'{}'
+    return response
+
+
+def test_get_session_shared():
+    """Test that the session is shared, except with forked processes."""
+    session = http_client.get_session()
+    assert http_client.get_session() is session
+    with patch.object(os, 'getpid', return_value=os.getpid() + 1):
+        forked = http_client.get_session()
+        assert forked is not session
+        assert http_client.get_session() is forked
+
+
+def test_host_pool_sizes():
+    """Test that listed hosts get pools of their own size."""
+    assert http_client._parse_host_pool_sizes('a.org=5, b.org=7,,c.org=x') == {
+        'a.org': 5, 'b.org': 7}
+    with patch.object(http_client, 'HTTP_HOST_POOL_MAXSIZE', 'registry.npmjs.org=42'):
+        session = http_client._create_session()
+    assert session.get_adapter('https://registry.npmjs.org/array')._pool_maxsize == 42
+    assert session.get_adapter('https://registry.npmjs.org.example.com/')._pool_maxsize == \
+        http_client.HTTP_POOL_MAXSIZE
+
+
+@patch.object(HTTPAdapter, 'send', side_effect=_response, autospec=True)
+def test_default_timeout(mocked_send):
+    """Test that requests without their own timeout get the default one."""
+    assert http_client.get('https://pypi.org/pypi/requests/json').json() == {}
+    assert mocked_send.call_args[1]['timeout'] == (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    http_client.get('https://pypi.org/pypi/requests/json', timeout=3)
+    assert mocked_send.call_args[1]['timeout'] == 3
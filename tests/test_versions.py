@@ -1,8 +1,10 @@
 """Test the code to retrieve package version from online sources."""
 
 from unittest.mock import patch
+import time
 import pytest
 
+from f8a_utils.cache import InMemoryCache
 from f8a_utils.versions import (
     get_versions_for_npm_package,
     get_versions_for_pypi_package,
@@ -11,11 +13,24 @@ from f8a_utils.versions import (
     get_latest_versions_for_ep,
     is_pkg_public,
     get_versions_and_latest_for_ep,
+    get_versions_for_ep_bulk,
     select_latest_version,
-    get_versions_for_golang_package
+    get_versions_for_golang_package,
+    get_version_cache,
+    set_version_cache
 )
 
 
+@pytest.fixture(autouse=True)
+def version_cache():
+    """Run every test with an empty version cache."""
+    previous = get_version_cache()
+    cache = InMemoryCache()
+    set_version_cache(cache)
+    yield cache
+    set_version_cache(previous)
+
+
 def test_is_pkg_public():
     """Test is_pkg_public function."""
     val = is_pkg_public("npm", "lodash")
@@ -128,18 +143,18 @@ class _response_json_value_error:
 
 
 def mocked_requests_get_no_json(url):
-    """Implement mocked function requests.get()."""
+    """Implement mocked function http_client.get()."""
     assert url
     return _response_no_json(200, """no JSON here""")
 
 
 def mocked_requests_get_value_error(url):
-    """Implement mocked function requests.get()."""
+    """Implement mocked function http_client.get()."""
     assert url
     return _response_json_value_error(200, """no JSON here""")
 
 
-@patch("requests.get", side_effect=mocked_requests_get_no_json)
+@patch("f8a_utils.http_client.get", side_effect=mocked_requests_get_no_json)
 def test_get_javascript_versions_empty_server_response(_mocked_get):
     """Test the behavior of function get_versions_for_npm_package for empty server response."""
     package_versions = get_versions_for_npm_package("array")
@@ -148,7 +163,7 @@ def test_get_javascript_versions_empty_server_response(_mocked_get):
     assert not package_versions
 
 
-@patch("requests.get", side_effect=mocked_requests_get_value_error)
+@patch("f8a_utils.http_client.get", side_effect=mocked_requests_get_value_error)
 def test_get_javascript_versions_server_response_without_json(_mocked_get):
     """Test get_versions_for_npm_package for server response w/o proper JSON."""
     package_versions = get_versions_for_npm_package("array")
@@ -284,3 +299,106 @@ def test_select_vesion_empty():
     assert "" == select_latest_version()
 
     assert "" == select_latest_version([])
+
+
+def mocked_get_versions_and_latest_for_ep(ecosystem, package_name, _multi_source=False):
+    """Implement mocked function get_versions_and_latest_for_ep()."""
+    if package_name == 'slow':
+        time.sleep(2)
+    if package_name == 'broken':
+        raise ValueError('Invalid package')
+    return {'versions': ['1.0.0', '1.1.0'], 'latest_version': '1.1.0'}
+
+
+@patch("f8a_utils.versions.get_versions_and_latest_for_ep",
+       side_effect=mocked_get_versions_and_latest_for_ep)
+def test_get_versions_for_ep_bulk(mocked_get):
+    """Test bulk lookup, deduplicating names and reporting errors per package."""
+    res = get_versions_for_ep_bulk("npm", ["lodash", "broken", "lodash", "array"])
+    assert list(res) == ["lodash", "broken", "array"]
+    assert mocked_get.call_count == 3
+    assert res["lodash"] == {'versions': ['1.0.0', '1.1.0'], 'latest_version': '1.1.0',
+                             'error': None}
+    assert res["broken"] == {'versions': None, 'latest_version': None,
+                             'error': 'Invalid package'}
+
+    assert get_versions_for_ep_bulk("pypi", []) == {}
+    with pytest.raises(ValueError):
+        get_versions_for_ep_bulk("cobol", ["cds-parsers"])
+
+
+@patch("f8a_utils.versions.get_versions_and_latest_for_ep",
+       side_effect=mocked_get_versions_and_latest_for_ep)
+def test_get_versions_for_ep_bulk_deadline(mocked_get):
+    """Test that packages not resolved before the deadline get an error."""
+    start = time.time()
+    res = get_versions_for_ep_bulk("maven", ["slow", "g:a"], max_workers=1, deadline=0.5)
+    assert time.time() - start < 1.5
+    assert res == {
+        "slow": {'versions': None, 'latest_version': None,
+                 'error': 'Deadline of 0.5 seconds exceeded'},
+        "g:a": {'versions': None, 'latest_version': None,
+                'error': 'Deadline of 0.5 seconds exceeded'},
+    }
+    # The lookup waiting for a worker was cancelled.
+    time.sleep(2)
+    assert mocked_get.call_count == 1
+
+
+class _response_json:
+    """Mock the HTTP response with JSON payload."""
+
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+def mocked_requests_get_npm(url):
+    """Implement mocked function http_client.get()."""
+    if url.endswith('/missing'):
+        return _response_json(404, {})
+    return _response_json(200, {'versions': {'4.17.20': {}, '4.17.21': {}},
+                                'dist-tags': {'latest': '4.17.21'}})
+
+
+@patch("f8a_utils.http_client.get", side_effect=mocked_requests_get_npm)
+def test_version_cache(mocked_get):
+    """Test that version lookups are served from the cache for the ecosystem TTL."""
+    assert sorted(get_versions_for_npm_package("lodash")) == ['4.17.20', '4.17.21']
+    versions = get_versions_for_npm_package(package_name="lodash")
+    assert sorted(versions) == ['4.17.20', '4.17.21']
+    versions.append('mutated')
+    assert sorted(get_versions_for_npm_package("lodash")) == ['4.17.20', '4.17.21']
+    assert mocked_get.call_count == 1
+
+    # Differently shaped results are cached separately.
+    assert get_versions_for_npm_package("lodash", latest=True) == '4.17.21'
+    assert get_versions_and_latest_for_ep("npm", "lodash")['latest_version'] == '4.17.21'
+    assert get_versions_and_latest_for_ep("npm", "lodash")['latest_version'] == '4.17.21'
+    assert mocked_get.call_count == 3
+
+    # Empty results are not cached.
+    assert get_versions_for_npm_package("missing") == []
+    assert get_versions_for_npm_package("missing") == []
+    assert mocked_get.call_count == 5
+
+    now = time.time()
+    with patch.object(time, 'time', return_value=now + 3601):
+        get_versions_for_npm_package("lodash")
+    assert mocked_get.call_count == 6
+
+    set_version_cache(None)
+    get_versions_for_npm_package("lodash")
+    assert mocked_get.call_count == 7
+
+
+@patch("f8a_utils.http_client.get", side_effect=mocked_requests_get_npm)
+def test_get_versions_for_ep_bulk_missing_package(_mocked_get):
+    """Test that unknown packages get an error instead of failing the bulk lookup."""
+    res = get_versions_for_ep_bulk("npm", ["missing", "lodash"])
+    assert res["missing"] == {'versions': None, 'latest_version': None,
+                              'error': 'Package not found'}
+    assert res["lodash"]["latest_version"] == '4.17.21'